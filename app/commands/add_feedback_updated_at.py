@@ -0,0 +1,40 @@
+"""Add ProductFeedback.updated_at, the time of a feedback's last edit.
+
+    python -m app.commands.add_feedback_updated_at [--dry-run]
+
+Until it exists, precomputed recommendations only notice new feedback, not
+likes flipped in place. Adding the column locks product_feedback briefly, so
+run it once during a quiet period and restart the workers afterwards.
+"""
+import argparse
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+
+MIGRATION = [
+    "ALTER TABLE product_feedback ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add product_feedback.updated_at")
+    parser.add_argument("--dry-run", action="store_true", help="Print the statements without running them")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        print(";\n".join(MIGRATION) + ";")
+        return
+
+    db = SessionLocal()
+    try:
+        for statement in MIGRATION:
+            print(statement)
+            db.execute(text(statement))
+        db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Build the IVF index used when VECTOR_SEARCH_MODE=ann.
+
+    python -m app.commands.build_ann_index [--n-lists 64] [--output image_ivf.npz]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.ann import IVFIndex
+from app.core.config import settings
+from app.core.embeddings import embedding_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embeddings", default=embedding_store.base_paths()[0])
+    parser.add_argument("--output", default=settings.ANN_INDEX_PATH)
+    parser.add_argument("--n-lists", type=int, default=settings.ANN_N_LISTS,
+                        help="Number of coarse clusters (0 picks sqrt of the catalog size)")
+    parser.add_argument("--n-iter", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embeddings = np.load(args.embeddings, mmap_mode="r")
+
+    started = time.perf_counter()
+    index = IVFIndex.build(embeddings, n_lists=args.n_lists, n_iter=args.n_iter, seed=args.seed)
+    index.save(args.output)
+
+    sizes = np.diff(index.list_offsets)
+    print(
+        f"Built {index.n_lists} lists over {len(index)} vectors in "
+        f"{time.perf_counter() - started:.2f}s (list size min {sizes.min()}, "
+        f"median {int(np.median(sizes))}, max {sizes.max()}) -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
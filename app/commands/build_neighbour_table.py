@@ -0,0 +1,39 @@
+"""Rebuild the item-to-item neighbour table; run it whenever the embeddings change.
+
+    python -m app.commands.build_neighbour_table [--neighbours 50] [--output image_neighbours]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.embeddings import embedding_store
+from app.core.neighbours import NeighbourTable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embeddings", default=embedding_store.base_paths()[0])
+    parser.add_argument("--output", default=settings.NEIGHBOUR_TABLE_PATH,
+                        help="Prefix of the _ids.npy / _scores.npy pair")
+    parser.add_argument("--neighbours", type=int, default=settings.NEIGHBOUR_TABLE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    embeddings = np.load(args.embeddings, mmap_mode="r")
+
+    started = time.perf_counter()
+    table = NeighbourTable.build(embeddings, args.neighbours, args.batch_size)
+    table.save(args.output)
+
+    size_mb = (table.ids.nbytes + table.scores.nbytes) / 1024 ** 2
+    print(
+        f"Built {table.n_neighbours} neighbours for {len(table)} rows in "
+        f"{time.perf_counter() - started:.2f}s ({size_mb:.1f} MB) -> "
+        + ", ".join(NeighbourTable.paths(args.output))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Add the Postgres full-text and trigram search indexes.
+
+    python -m app.commands.create_search_indexes [--tables products brands] [--dry-run]
+
+Enables pg_trgm and adds a generated, GIN-indexed ``search_vector`` column
+plus a trigram index on the name column of each table. The generated
+columns follow every insert and update, so nothing needs re-running when
+the catalog changes. Safe to run repeatedly; afterwards set
+TEXT_SEARCH_MODE=postgres (and PRODUCT_SEARCH_MODE=postgres for products).
+"""
+import argparse
+
+from sqlalchemy import text
+
+from app.core.text_search import SEARCH_COLUMNS, migration
+from app.db.database import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the Postgres text search columns and indexes")
+    parser.add_argument("--tables", nargs="+", choices=list(SEARCH_COLUMNS), default=list(SEARCH_COLUMNS))
+    parser.add_argument("--dry-run", action="store_true", help="Print the statements without running them")
+    args = parser.parse_args()
+
+    statements = migration(args.tables)
+    if args.dry_run:
+        print(";\n".join(statements) + ";")
+        return
+
+    db = SessionLocal()
+    try:
+        for statement in statements:
+            print(statement)
+            db.execute(text(statement))
+        db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Offline evaluation and latency benchmark of the recommender's scoring modes.
+
+    python -m app.commands.evaluate_recommendations [--source synthetic|db] [--users 500]
+        [--modes exact batched ann int8] [--k 10 20 50]
+
+Replays liked-product histories against the real embedding files: each
+user's most recent ``--holdout`` likes are hidden, up to MAX_SEEDS earlier
+likes seed the recommender and the hidden ones are looked for in its
+ranked list. Per mode it reports recall@k, catalog coverage, the overlap
+of its top k with the ``exact`` ranking, per-user latency percentiles and
+the peak memory allocated while scoring.
+
+``--source synthetic`` (the default) generates users whose likes are drawn
+around a random anchor product; ``--source db`` replays recorded
+ProductFeedback likes.
+
+Modes: ``exact`` scores one user at a time against the whole matrix,
+``batched`` scores ``--chunk-size`` users per stacked matrix product as the
+precompute job does (its latency is the chunk's time per user), ``ann`` probes the IVF index, ``float16`` / ``int8``
+scan a quantized copy with exact rescoring, and ``neighbours`` reads the
+precomputed neighbour table.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+from app.commands.precompute_recommendations import MAX_SEEDS
+from app.core import vector_search
+from app.core.ann import IVFIndex
+from app.core.config import settings
+from app.core.embeddings import get_embedding_store
+from app.core.precomputed import recommend_batch
+from app.core.quantization import QUANTIZATIONS, QuantizedMatrix
+from app.db.database import SessionLocal
+from app.models.models import ProductFeedback
+
+MODES = ("exact", "batched", "ann") + QUANTIZATIONS + ("neighbours",)
+
+
+def synthetic_histories(vectors, n_users: int, n_likes: int, pool_size: int, rng):
+    """Like histories drawn from the ``pool_size`` nearest products of a random anchor"""
+    anchors = rng.choice(len(vectors), n_users, replace=len(vectors) < n_users)
+    pools, _ = vector_search.exact_search(vectors, vectors[anchors], pool_size)
+    return [rng.permutation(pool)[:n_likes].tolist() for pool in pools]
+
+
+def recorded_histories(store, min_likes: int):
+    """Liked embedding rows per user from ProductFeedback, oldest first"""
+    histories = defaultdict(list)
+    with SessionLocal() as db:
+        store.sync_product_ids(db)
+        likes = (
+            db.query(ProductFeedback.user_id, ProductFeedback.product_id)
+            .filter(ProductFeedback.liked == True)
+            .order_by(ProductFeedback.user_id, ProductFeedback.created_at)
+        )
+        for user_id, product_id in likes:
+            row = store.row_for_product_id(product_id)
+            if row is not None:
+                histories[user_id].append(row)
+    return [rows for rows in histories.values() if len(set(rows)) >= min_likes]
+
+
+def split_histories(histories, holdout: int):
+    """(seeds, held-out rows) per user: the newest ``holdout`` likes are hidden"""
+    cases = []
+    for rows in histories:
+        rows = list(dict.fromkeys(rows))
+        seeds, hidden = rows[:-holdout][-MAX_SEEDS:], rows[-holdout:]
+        if seeds and hidden:
+            cases.append((seeds, hidden))
+    return cases
+
+
+def make_scorer(mode: str, store, k: int, aggregation: str, nprobe: int, rescore: int):
+    """``(score(seeds) -> rows, index_bytes)`` for one scoring mode"""
+    vectors = store.image_embeddings
+
+    def exclude_mask(seeds):
+        exclude = np.zeros(len(vectors), dtype=bool)
+        exclude[seeds] = True
+        return exclude
+
+    if mode == "exact":
+        def score(seeds):
+            scores = vector_search.blended_scores(vectors, vectors[seeds])
+            rows, _ = vector_search.top_k_aggregated(scores, k, aggregation, exclude=seeds)
+            return rows
+        return score, 0
+
+    if mode == "ann":
+        index = store.ann_index
+        if index is None:
+            index = IVFIndex.build(vectors, n_lists=settings.ANN_N_LISTS or None, nprobe=nprobe)
+        index_bytes = index.centroids.nbytes + index.list_offsets.nbytes + index.list_rows.nbytes
+
+        def score(seeds):
+            candidates, scores = index.search(vectors[seeds], k, nprobe, exclude_mask(seeds))
+            rows, _ = vector_search.aggregate_candidates(candidates, scores, k, aggregation)
+            return rows
+        return score, index_bytes
+
+    if mode in QUANTIZATIONS:
+        quantized = QuantizedMatrix.quantize(vectors, mode)
+
+        def score(seeds):
+            candidates, scores = quantized.search(vectors[seeds], k, vectors, rescore, exclude_mask(seeds))
+            rows, _ = vector_search.aggregate_candidates(candidates, scores, k, aggregation)
+            return rows
+        return score, quantized.nbytes
+
+    if mode == "neighbours":
+        table = store.neighbours
+        if table is None:
+            raise ValueError(
+                "No neighbour table to evaluate; run `python -m app.commands.build_neighbour_table`"
+            )
+
+        # The lookup the live recommender serves from, falling back to exact for uncovered seeds
+        exact_score, _ = make_scorer("exact", store, k, aggregation, nprobe, rescore)
+
+        def score(seeds):
+            neighbours = store.lookup_neighbours(seeds, k, exclude_mask(seeds))
+            if neighbours is None:
+                return exact_score(seeds)
+            candidates, _ = neighbours
+            rows, _ = vector_search.rescore_candidates(vectors, vectors[seeds], candidates, k, aggregation)
+            return rows
+        return score, table.ids.nbytes + table.scores.nbytes
+
+    raise ValueError(f"Unknown mode '{mode}', expected one of {MODES}")
+
+
+def run_mode(mode: str, store, cases, k: int, aggregation: str, args):
+    """Ranked rows per case plus per-user latencies (ms) and peak traced memory (bytes)"""
+    tracemalloc.start()
+    results, latencies = [], []
+
+    if mode == "batched":
+        index_bytes = 0
+        for start in range(0, len(cases), args.chunk_size):
+            chunk = [seeds for seeds, _ in cases[start:start + args.chunk_size]]
+            started = time.perf_counter()
+            results.extend(recommend_batch(store.image_embeddings, store.text_embeddings, chunk, 0, aggregation, k=k))
+            # Amortized: the chunk's time spread over its users
+            latencies.extend([(time.perf_counter() - started) / len(chunk)] * len(chunk))
+    else:
+        score, index_bytes = make_scorer(mode, store, k, aggregation, args.nprobe, args.rescore)
+        for seeds, _ in cases:
+            started = time.perf_counter()
+            results.append(score(np.asarray(seeds, dtype=np.int64)))
+            latencies.append(time.perf_counter() - started)
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, np.asarray(latencies) * 1000, peak, index_bytes
+
+
+def evaluate(results, cases, ks, n_rows: int, exact_results=None):
+    metrics = {}
+    if exact_results is not None:
+        # How far the mode strays from the exact ranking at the largest k
+        k = max(ks)
+        metrics["exact_overlap"] = float(np.mean([
+            len(set(np.asarray(rows[:k]).tolist()) & set(np.asarray(exact[:k]).tolist())) / max(len(exact[:k]), 1)
+            for rows, exact in zip(results, exact_results)
+        ]))
+
+    for k in ks:
+        hits = [
+            len(set(np.asarray(rows[:k]).tolist()) & set(hidden)) / len(hidden)
+            for rows, (_, hidden) in zip(results, cases)
+        ]
+        metrics[f"recall@{k}"] = float(np.mean(hits))
+
+    recommended = np.unique(np.concatenate([np.asarray(rows[:max(ks)], dtype=np.int64) for rows in results]))
+    metrics["coverage"] = len(recommended[recommended >= 0]) / n_rows
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate and benchmark the recommender's scoring modes")
+    parser.add_argument("--source", choices=("synthetic", "db"), default="synthetic")
+    parser.add_argument("--users", type=int, default=500, help="Synthetic users")
+    parser.add_argument("--likes", type=int, default=12, help="Likes per synthetic user")
+    parser.add_argument("--pool-size", type=int, default=50, help="Products around each synthetic user's anchor")
+    parser.add_argument("--holdout", type=int, default=2, help="Newest likes hidden per user")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=["exact", "batched", "ann", "int8"])
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 20, 50])
+    parser.add_argument("--aggregation", default=settings.RECOMMENDATION_AGGREGATION)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=settings.ANN_NPROBE)
+    parser.add_argument("--rescore", type=int, default=settings.QUANTIZED_RESCORE_CANDIDATES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--min-exact-overlap", type=float, default=0.0,
+                        help="Exit non-zero if a mode's top k overlaps the exact ranking less than this")
+    args = parser.parse_args()
+
+    store = get_embedding_store()
+    n_rows = len(store.image_embeddings)
+
+    if args.source == "synthetic":
+        rng = np.random.default_rng(args.seed)
+        histories = synthetic_histories(store.image_embeddings, args.users, args.likes, args.pool_size, rng)
+    else:
+        histories = recorded_histories(store, args.holdout + 1)
+    cases = split_histories(histories, args.holdout)
+    if not cases:
+        raise SystemExit("No users with enough likes to evaluate")
+
+    k = max(args.k)
+    print(f"catalog={n_rows} users={len(cases)} source={args.source} aggregation={args.aggregation} k={args.k}")
+    header = "".join(f"{f'R@{value}':>8}" for value in args.k)
+    print(f"{'mode':>10}{header}{'cover':>8}{'exact':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'peak MB':>9}{'index MB':>10}")
+
+    # Every mode is compared with the exact ranking, scored first
+    modes = ["exact"] + [mode for mode in args.modes if mode != "exact"]
+    exact_results = None
+    report = []
+    for mode in modes:
+        results, latencies, peak, index_bytes = run_mode(mode, store, cases, k, args.aggregation, args)
+        if exact_results is None:
+            exact_results = results
+        metrics = evaluate(results, cases, args.k, n_rows, exact_results)
+        row = {
+            "mode": mode,
+            **metrics,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "peak_mb": peak / 2**20,
+            "index_mb": index_bytes / 2**20,
+        }
+        report.append(row)
+
+        recalls = "".join(f"{row[f'recall@{value}']:>8.3f}" for value in args.k)
+        print(f"{mode:>10}{recalls}{row['coverage']:>8.3f}{row['exact_overlap']:>8.3f}"
+              f"{row['p50_ms']:>9.3f}{row['p95_ms']:>9.3f}{row['p99_ms']:>9.3f}"
+              f"{row['peak_mb']:>9.1f}{row['index_mb']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"users": len(cases), "source": args.source, "results": report}, f, indent=2)
+
+    diverging = [row["mode"] for row in report if row["exact_overlap"] < args.min_exact_overlap]
+    if diverging:
+        raise SystemExit(f"Top {k} overlap with the exact ranking below {args.min_exact_overlap}: {diverging}")
+
+
+if __name__ == "__main__":
+    main()
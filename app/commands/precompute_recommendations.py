@@ -0,0 +1,128 @@
+"""Precompute recommendations for every active user with likes.
+
+    python -m app.commands.precompute_recommendations [--chunk-size 256]
+
+Reads each user's most recent likes in chunks of users, scores every chunk
+with one stacked matrix product (masking each user's rated and ordered
+products and everything unavailable before top-k, like the live path)
+and writes the top rows per user to
+PRECOMPUTED_RECOMMENDATIONS_PATH. /feedback/recommendations serves from that
+file and only scores live for users with feedback newer than the run.
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.embeddings import get_embedding_store
+from app.core.exclusions import availability_mask, excluded_product_ids_by_user, excluded_rows
+from app.core.precomputed import PrecomputedRecommendations, recommend_batch
+from app.db.database import SessionLocal
+from app.models.models import ProductFeedback, User
+
+# Matches the number of likes the live recommender seeds from
+MAX_SEEDS = 10
+
+
+def active_user_ids(db):
+    return [
+        user_id for (user_id,) in db.query(ProductFeedback.user_id)
+        .join(User, User.id == ProductFeedback.user_id)
+        .filter(ProductFeedback.liked == True, User.is_active == True)
+        .distinct()
+        .order_by(ProductFeedback.user_id)
+    ]
+
+
+def recent_likes(db, user_ids):
+    """Product ids of each user's most recent likes, newest first"""
+    recency = func.row_number().over(
+        partition_by=ProductFeedback.user_id,
+        order_by=ProductFeedback.created_at.desc(),
+    ).label("recency")
+
+    likes = (
+        db.query(ProductFeedback.user_id, ProductFeedback.product_id, recency)
+        .filter(ProductFeedback.liked == True, ProductFeedback.user_id.in_(user_ids))
+        .subquery()
+    )
+
+    product_ids = defaultdict(list)
+    for user_id, product_id, _ in (
+        db.query(likes).filter(likes.c.recency <= MAX_SEEDS).order_by(likes.c.user_id, likes.c.recency)
+    ):
+        product_ids[user_id].append(product_id)
+    return product_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendations for all active users")
+    parser.add_argument("--output", default=settings.PRECOMPUTED_RECOMMENDATIONS_PATH)
+    parser.add_argument("--chunk-size", type=int, default=256, help="Users scored per matrix product")
+    parser.add_argument("--top-k", type=int, default=3, help="Recommendations per liked product")
+    parser.add_argument("--aggregation", default=settings.RECOMMENDATION_AGGREGATION)
+    parser.add_argument("--text-weight", type=float, default=settings.RECOMMENDATION_TEXT_WEIGHT)
+    args = parser.parse_args()
+
+    store = get_embedding_store()
+    generated_at = time.time()
+    started = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        store.sync_product_ids(db)
+        user_ids = active_user_ids(db)
+        snapshot = store.snapshot
+        unavailable = ~availability_mask.get(db, snapshot)
+        max_rows = args.top_k * MAX_SEEDS
+
+        scored_users = []
+        seeds = np.full((len(user_ids), MAX_SEEDS), -1, dtype=np.int32)
+        rows = np.full((len(user_ids), max_rows), -1, dtype=np.int32)
+
+        for start in range(0, len(user_ids), args.chunk_size):
+            chunk = user_ids[start:start + args.chunk_size]
+            liked = recent_likes(db, chunk)
+            excluded = excluded_product_ids_by_user(db, chunk)
+
+            chunk_users, chunk_seeds, chunk_excluded = [], [], []
+            for user_id in chunk:
+                user_seeds = [snapshot.row_for_product_id(product_id) for product_id in liked.get(user_id, [])]
+                user_seeds = list(dict.fromkeys(row for row in user_seeds if row is not None))
+                if user_seeds:
+                    chunk_users.append(user_id)
+                    chunk_seeds.append(user_seeds)
+                    chunk_excluded.append(excluded_rows(snapshot, excluded.get(user_id, ())))
+
+            if not chunk_users:
+                continue
+
+            chunk_rows = recommend_batch(
+                snapshot.image_embeddings, snapshot.text_embeddings, chunk_seeds,
+                args.top_k, args.aggregation, args.text_weight,
+                unavailable=unavailable, excluded_rows_by_user=chunk_excluded,
+            )
+            for user_id, user_seeds, user_rows in zip(chunk_users, chunk_seeds, chunk_rows):
+                position = len(scored_users)
+                seeds[position, :len(user_seeds)] = user_seeds
+                rows[position, :len(user_rows)] = user_rows
+                scored_users.append(user_id)
+
+            print(f"Scored {start + len(chunk)}/{len(user_ids)} users")
+    finally:
+        db.close()
+
+    n_users = len(scored_users)
+    PrecomputedRecommendations(
+        np.asarray(scored_users, dtype=np.int64), seeds[:n_users], rows[:n_users],
+        generated_at, args.top_k, args.aggregation, args.text_weight,
+    ).save(args.output)
+
+    print(f"Wrote recommendations for {n_users} users in {time.perf_counter() - started:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
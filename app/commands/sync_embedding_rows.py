@@ -0,0 +1,68 @@
+"""Populate Product.embedding_row from the embedding catalog.
+
+    python -m app.commands.sync_embedding_rows [--dry-run]
+
+Adds the indexed column if the table predates it, then matches every
+product's thumbnail filename to its row in metadata2.csv. Run it after the
+catalog or the embedding files change; hydration afterwards is a lookup by
+product_id and no longer depends on thumbnail strings.
+"""
+import argparse
+import logging
+
+from sqlalchemy import text
+
+from app.core.embeddings import get_embedding_store
+from app.db.database import SessionLocal
+from app.models.models import Product
+
+logger = logging.getLogger(__name__)
+
+MIGRATION = [
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_row INTEGER",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_products_embedding_row ON products (embedding_row)",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Product.embedding_row with the embedding files")
+    parser.add_argument("--dry-run", action="store_true", help="Report the mapping without writing it")
+    args = parser.parse_args()
+
+    store = get_embedding_store()
+    db = SessionLocal()
+    try:
+        for statement in MIGRATION:
+            db.execute(text(statement))
+
+        updates = []
+        product_by_row = {}
+        duplicates = 0
+        for id, product_id, thumbnail in db.query(Product.id, Product.product_id, Product.thumbnail):
+            row = store.row_for_thumbnail(thumbnail)
+            if row is not None and row in product_by_row:
+                logger.warning(f"Products {product_by_row[row]} and {product_id} share embedding row {row}")
+                duplicates += 1
+                row = None
+            if row is not None:
+                product_by_row[row] = product_id
+            updates.append({"id": id, "embedding_row": row})
+
+        print(
+            f"{len(product_by_row)} of {len(updates)} products mapped to embedding rows, "
+            f"{duplicates} duplicate thumbnails skipped"
+        )
+        if args.dry_run:
+            db.rollback()
+            return
+
+        # Clear first so rows moving between products never trip the unique index
+        db.query(Product).update({Product.embedding_row: None}, synchronize_session=False)
+        db.bulk_update_mappings(Product, updates)
+        db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import logging
+from typing import Optional
+
+import numpy as np
+
+from app.core.vector_search import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    """Nearest centroid (by inner product) for every vector, in batches"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch_size):
+        batch = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+        assignments[start:start + batch_size] = np.argmax(batch @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 20,
+                     seed: int = 0, sample_size: Optional[int] = None) -> np.ndarray:
+    """Unit-norm k-means centroids for inner-product search"""
+    rng = np.random.default_rng(seed)
+    n_items = len(vectors)
+
+    if sample_size and sample_size < n_items:
+        sample = np.sort(rng.choice(n_items, sample_size, replace=False))
+        train = np.asarray(vectors[sample], dtype=np.float32)
+    else:
+        train = np.asarray(vectors, dtype=np.float32)
+
+    centroids = train[rng.choice(len(train), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = _assign(train, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_clusters)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        non_empty = counts > 0
+        sums = np.add.reduceat(train[order], starts[non_empty], axis=0)
+        centroids[non_empty] = sums
+
+        # Re-seed empty clusters with random training points
+        n_empty = int((~non_empty).sum())
+        if n_empty:
+            centroids[~non_empty] = train[rng.choice(len(train), n_empty, replace=False)]
+
+        centroids = _normalize(centroids)
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted-file index over unit-norm embeddings.
+
+    Vectors are bucketed by their nearest coarse k-means centroid. A query
+    only scores the vectors in its ``nprobe`` closest buckets, so search cost
+    scales with ``nprobe / n_lists`` of the catalog instead of all of it.
+    The index stores row ids only; vectors are read from the (memory-mapped)
+    embedding matrix it is attached to.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray,
+                 list_rows: np.ndarray, vectors: np.ndarray = None, nprobe: int = 8):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.vectors = vectors
+        self.nprobe = nprobe
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return len(self.list_rows)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: int = None, n_iter: int = 20,
+              seed: int = 0, nprobe: int = 8, sample_size: int = 100_000) -> "IVFIndex":
+        n_items = len(vectors)
+        if not n_lists:
+            n_lists = max(1, int(np.sqrt(n_items)))
+        n_lists = min(n_lists, n_items)
+
+        centroids = spherical_kmeans(vectors, n_lists, n_iter, seed, sample_size)
+        assignments = _assign(vectors, centroids)
+
+        list_rows = np.argsort(assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(assignments, minlength=n_lists)
+        list_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+        logger.info(f"Built IVF index with {n_lists} lists over {n_items} vectors")
+        return cls(centroids, list_offsets, list_rows, vectors, nprobe)
+
+    def save(self, path: str):
+        np.savez(path, centroids=self.centroids, list_offsets=self.list_offsets,
+                 list_rows=self.list_rows)
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray, nprobe: int = 8) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["list_offsets"], data["list_rows"], vectors, nprobe)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray = None):
+        """Insert new rows into their nearest lists without retraining the centroids.
+
+        ``vectors`` replaces the attached matrix first, e.g. after it grew.
+        """
+        if vectors is not None:
+            self.vectors = vectors
+
+        rows = np.asarray(rows, dtype=np.int64)
+        list_ids = np.concatenate([
+            np.repeat(np.arange(self.n_lists), np.diff(self.list_offsets)),
+            _assign(self.vectors[rows], self.centroids),
+        ])
+        all_rows = np.concatenate([self.list_rows, rows])
+
+        order = np.argsort(list_ids, kind="stable")
+        self.list_rows = all_rows[order]
+        counts = np.bincount(list_ids, minlength=self.n_lists)
+        self.list_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+
+    def search(self, queries: np.ndarray, k: int, nprobe: int = None, exclude: np.ndarray = None):
+        """Approximate top k rows for each query.
+
+        ``exclude`` is an optional boolean mask over rows. Returns
+        ``(rows, scores)`` of shape ``(n_queries, k)``, best first, padded
+        with -1 / -inf when the probed lists hold fewer than k candidates.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        probes = top_k_indices(queries @ self.centroids.T, nprobe)
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            # Sorted row ids keep the gather from the memory map mostly sequential
+            candidates = np.sort(np.concatenate([
+                self.list_rows[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+                for list_id in lists
+            ]))
+            if exclude is not None:
+                candidates = candidates[~exclude[candidates]]
+            if not len(candidates):
+                continue
+
+            candidate_scores = np.asarray(self.vectors[candidates] @ query)
+            best = top_k_indices(candidate_scores, k)
+
+            rows[i, :len(best)] = candidates[best]
+            scores[i, :len(best)] = candidate_scores[best]
+
+        return rows, scores
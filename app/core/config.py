@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 
@@ -19,6 +21,68 @@ class Settings(BaseSettings):
     NGROK_URL: str = "https://your-ngrok-url.ngrok.io"  
     USE_NGROK: bool = False  
     SEARCH_API_URL: str = "https://9e24-103-221-254-42.ngrok-free.app"
+    SEARCH_ENGINE: str = "remote"  # remote (SEARCH_API_URL) or local (in-process vector search)
+    SEARCH_TOP_K: int = 20  # results per local search
+    SEARCH_API_TIMEOUT: float = 10.0  # seconds
+    SEARCH_API_CONNECT_TIMEOUT: float = 3.0
+    SEARCH_API_MAX_CONNECTIONS: int = 20
+    SEARCH_API_MAX_KEEPALIVE: int = 10
+    SEARCH_API_MAX_CONCURRENCY: int = 16  # requests in flight per worker
+    SEARCH_CACHE_SIZE: int = 5000  # queries, 0 disables the cache
+    SEARCH_CACHE_TTL: int = 300  # seconds
+
+    # Recommendation Embeddings
+    IMAGE_EMBEDDINGS_PATH: str = "image_embeddings.npy"
+    TEXT_EMBEDDINGS_PATH: str = "text_embeddings.npy"
+    METADATA_PATH: str = "metadata2.csv"
+    EMBEDDINGS_MMAP_MODE: str = "r"
+    RECOMMENDATION_AGGREGATION: str = "rrf"  # max, mean or rrf
+    RECOMMENDATION_TEXT_WEIGHT: float = 0.0  # share of text similarity in the blended score
+    RECOMMENDATION_CACHE_SIZE: int = 10000  # users, 0 disables the cache
+    RECOMMENDATION_CACHE_TTL: int = 600  # seconds
+    PRECOMPUTED_RECOMMENDATIONS_PATH: str = "precomputed_recommendations.npz"
+    RECOMMENDATION_DIVERSITY_LAMBDA: float = 1.0  # MMR trade-off, 1 disables diversity re-ranking
+    SEARCH_DIVERSITY_LAMBDA: float = 1.0
+    DIVERSITY_CANDIDATES: int = 300  # candidates the MMR re-ranker chooses from
+
+    # Random product sampling for swipe decks and fallbacks
+    PRODUCT_POOL_REFRESH_SECONDS: int = 300
+    SWIPE_DECK_BATCH_SIZE: int = 50  # products added to a user's deck per refill
+    SWIPE_DECK_LOW_WATER: int = 20  # refill in the background below this many queued products
+    SWIPE_DECK_MAX_USERS: int = 10000
+    SWIPE_DECK_TTL: int = 1800  # seconds an idle user's deck is kept
+
+    # Columnar product filtering and facets for brand listings
+    PRODUCT_FILTER_MODE: str = "columns"  # columns (in-memory NumPy filters with facets) or sql
+    PRODUCT_COLUMNS_REFRESH_SECONDS: int = 300  # full reload to pick up other workers' writes
+    PRODUCT_FACET_PRICE_BUCKETS: List[int] = [0, 500, 1000, 2500, 5000, 10000]  # lower bounds
+
+    # Vector Search
+    VECTOR_SEARCH_MODE: str = "exact"  # exact, ann, float16 or int8
+    ANN_INDEX_PATH: str = "image_ivf.npz"
+    ANN_N_LISTS: int = 0  # 0 picks sqrt(catalog size)
+    ANN_NPROBE: int = 8
+    QUANTIZED_RESCORE_CANDIDATES: int = 200
+    NEIGHBOUR_TABLE_PATH: str = "image_neighbours"  # prefix of the _ids.npy/_scores.npy pair
+    NEIGHBOUR_TABLE_SIZE: int = 50
+
+    # Incremental indexing of new product images
+    EMBEDDING_ENCODER: str = "app.core.encoders.FashionCLIPEncoder"
+    EMBEDDINGS_INCREMENTAL_INDEXING: bool = True
+    EMBEDDINGS_DELTA_DIR: str = "embeddings_delta"
+    EMBEDDINGS_DATA_DIR: str = "embeddings_data"  # compacted base files; the shipped ones are never rewritten
+    EMBEDDINGS_MAINTENANCE_INTERVAL: int = 60  # seconds between delta refresh/compaction checks
+    EMBEDDINGS_COMPACTION_MIN_ROWS: int = 1000  # delta rows that trigger a merge into the base files
+
+    # Keyword search over product titles and descriptions
+    PRODUCT_SEARCH_MODE: str = "bm25"  # bm25 (in-process index), postgres (tsvector + pg_trgm) or like
+    TEXT_SEARCH_MODE: str = "like"  # brand, category and user search: like or postgres
+    HYBRID_LEXICAL_CANDIDATES: int = 50  # keyword matches fused with the vector results
+    HYBRID_LEXICAL_WEIGHT: float = 1.0  # RRF weight of the keyword ranking
+    HYBRID_VECTOR_WEIGHT: float = 1.0  # RRF weight of the embedding ranking
+    SUGGEST_CHECK_SECONDS: int = 15  # rebuild autocomplete this soon after a catalog change
+    SUGGEST_REFRESH_SECONDS: int = 600  # full rebuild to pick up other workers' changes and popularity
+    KEYWORD_INDEX_REFRESH_SECONDS: int = 300  # full rebuild to pick up other workers' changes
 
     @property
     def BASE_URL(self) -> str:
@@ -0,0 +1,126 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.sampling import ProductIdPool, product_id_pool
+from app.db.database import SessionLocal
+from app.models.models import ProductFeedback
+
+logger = logging.getLogger(__name__)
+
+
+class _Deck:
+    __slots__ = ("queued", "served")
+
+    def __init__(self, served_size: int):
+        self.queued = deque()
+        # Recently shown ids, kept out of refills until the user rates them
+        self.served = deque(maxlen=served_size)
+
+
+class SwipeDeckQueues:
+    """Per-user queues of product ids for the swipe deck.
+
+    Each queue is filled in batches of ``batch_size`` random available
+    products the user has not rated yet. ``pop`` takes ids from the front
+    and schedules a background refill once fewer than ``low_water`` remain,
+    so a request normally costs a deque pop plus the hydration query. Only
+    a user's first request (or one asking for more than is queued) fills
+    synchronously, with enough ids for the whole request.
+    """
+
+    def __init__(self, pool: ProductIdPool, batch_size: int, low_water: int,
+                 max_users: int, ttl: float, max_workers: int = 2):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self._decks = TTLCache(max_users, ttl)
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="swipe-deck")
+
+    def pop(self, db: Session, user_id: int, n: int) -> List[int]:
+        """Up to ``n`` product ids for the user's next swipe cards"""
+        deck = self._decks.get(user_id)
+        if deck is None:
+            deck = _Deck(served_size=self.batch_size * 4)
+        # Setting on every pop restarts the TTL, so only idle users' decks expire
+        self._decks.set(user_id, deck)
+
+        if len(deck.queued) < n:
+            self._fill(db, user_id, deck, n)
+
+        product_ids = []
+        while len(product_ids) < n:
+            try:
+                product_ids.append(deck.queued.popleft())
+            except IndexError:
+                break
+        deck.served.extend(product_ids)
+
+        if len(deck.queued) < self.low_water:
+            self._schedule_refill(user_id, deck)
+        return product_ids
+
+    def discard(self, user_id: int, product_id: int):
+        """Drop a product the user just rated from their queue"""
+        deck = self._decks.get(user_id)
+        if deck is not None:
+            try:
+                deck.queued.remove(product_id)
+            except ValueError:
+                pass
+
+    def stats(self) -> dict:
+        return {**self._decks.stats(), "refilling": len(self._refilling)}
+
+    def _schedule_refill(self, user_id: int, deck: _Deck):
+        with self._lock:
+            if user_id in self._refilling:
+                return
+            self._refilling.add(user_id)
+        self._executor.submit(self._refill, user_id, deck)
+
+    def _refill(self, user_id: int, deck: _Deck):
+        try:
+            with SessionLocal() as db:
+                self._fill(db, user_id, deck)
+        except Exception:
+            logger.exception(f"Failed to refill the swipe deck of user {user_id}")
+        finally:
+            with self._lock:
+                self._refilling.discard(user_id)
+
+    def _fill(self, db: Session, user_id: int, deck: _Deck, n: int = 0):
+        """Queue one batch, or enough for ``n`` queued ids if that is more"""
+        rated = [product_id for (product_id,) in db.query(ProductFeedback.product_id).filter(
+            ProductFeedback.user_id == user_id
+        )]
+        exclude = set(rated)
+        exclude.update(deck.queued)
+        exclude.update(deck.served)
+        # The pool returns the full count unless the catalog runs out
+        sampled = self.pool.sample(db, max(self.batch_size, n - len(deck.queued)), exclude)
+
+        # A background refill and a synchronous fill may race; keep the queue free of duplicates
+        with self._lock:
+            queued = set(deck.queued)
+            deck.queued.extend(product_id for product_id in sampled if product_id not in queued)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+swipe_decks = SwipeDeckQueues(
+    product_id_pool,
+    settings.SWIPE_DECK_BATCH_SIZE,
+    settings.SWIPE_DECK_LOW_WATER,
+    settings.SWIPE_DECK_MAX_USERS,
+    settings.SWIPE_DECK_TTL,
+)
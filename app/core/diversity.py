@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def rank_relevance(n: int) -> np.ndarray:
+    """Linearly decreasing relevance for candidates that only come with a rank"""
+    return np.linspace(1.0, 0.0, n, endpoint=False, dtype=np.float32) if n else np.empty(0, dtype=np.float32)
+
+
+def mmr(vectors: np.ndarray, relevance: np.ndarray, k: int, lambda_: float = 0.7) -> np.ndarray:
+    """Positions of up to k candidates in maximal-marginal-relevance order.
+
+    Each step picks the candidate maximising
+    ``lambda_ * relevance - (1 - lambda_) * max similarity to those already picked``.
+    Relevance is min-max scaled to [0, 1] first so that cosine, RRF and
+    rank-based scores trade off against similarity the same way.
+    ``lambda_ = 1`` keeps the relevance order; lower values favour diversity.
+
+    The pairwise similarities of the n candidates are one (n, n) matrix
+    product; each of the k greedy steps is then O(n) vector work.
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    spread = relevance.max() - relevance.min()
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones(n, dtype=np.float32)
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    selected = np.empty(k, dtype=np.int64)
+    selected[0] = np.argmax(relevance)
+    max_similarity = similarity[selected[0]].copy()
+    taken = np.zeros(n, dtype=bool)
+    taken[selected[0]] = True
+
+    weighted_relevance = lambda_ * relevance
+    for step in range(1, k):
+        marginal = weighted_relevance - (1.0 - lambda_) * max_similarity
+        marginal[taken] = -np.inf
+        pick = np.argmax(marginal)
+        selected[step] = pick
+        taken[pick] = True
+        np.maximum(max_similarity, similarity[pick], out=max_similarity)
+    return selected
@@ -0,0 +1,642 @@
+import copy
+import fcntl
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.core.config import settings
+from app.core.ann import IVFIndex
+from app.core.neighbours import NeighbourTable
+from app.core.quantization import QUANTIZATIONS, QuantizedMatrix
+from app.core import vector_search
+from app.models.models import Product
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("exact", "ann") + QUANTIZATIONS
+
+
+class EmbeddingSnapshot:
+    """One consistent view of the embedding store.
+
+    Holds the base and delta segments, the metadata, the row <-> product
+    mapping and the search structures for them. The store never changes a
+    published snapshot; appends, reloads and remaps build a new one and swap
+    it in with one assignment. A request that reads ``store.snapshot`` once
+    therefore sees matrices, metadata and mapping of the same length
+    throughout, whatever the store does meanwhile.
+    """
+
+    def __init__(self, base_image: np.ndarray, base_text: np.ndarray, delta_image: np.ndarray,
+                 delta_text: np.ndarray, metadata: pd.DataFrame, search_mode: str = "exact",
+                 ann_index: IVFIndex = None, quantized: QuantizedMatrix = None,
+                 neighbours: NeighbourTable = None, rescore_candidates: int = 200):
+        self.base_image = base_image
+        self.delta_image = delta_image
+        self.search_mode = search_mode
+        self.ann_index = ann_index
+        self.quantized = quantized
+        self.neighbours = neighbours
+        self.rescore_candidates = rescore_candidates
+
+        if len(delta_image):
+            self.image_embeddings = vector_search.SegmentedMatrix([base_image, delta_image])
+            self.text_embeddings = vector_search.SegmentedMatrix([base_text, delta_text])
+        else:
+            self.image_embeddings = base_image
+            self.text_embeddings = base_text
+        self.metadata = metadata
+        self._build_index(metadata)
+
+    def __len__(self) -> int:
+        return len(self.image_embeddings)
+
+    def remapped(self, product_ids: np.ndarray, row_by_product_id: dict) -> "EmbeddingSnapshot":
+        """A copy of this snapshot with another row <-> product_id mapping"""
+        snapshot = copy.copy(self)
+        snapshot.product_ids = product_ids
+        snapshot.row_by_product_id = row_by_product_id
+        return snapshot
+
+    def carry_mapping(self, previous: "EmbeddingSnapshot") -> "EmbeddingSnapshot":
+        """This snapshot with ``previous``'s (possibly database-synced) mapping.
+
+        Rows never change number, so the mapping of the rows ``previous``
+        had is kept and only rows beyond it are mapped from their metadata.
+        """
+        product_ids, row_by_product_id = previous.product_ids, previous.row_by_product_id
+        new_product_ids = self.product_ids.copy()
+        new_product_ids[:len(product_ids)] = product_ids[:len(new_product_ids)]
+
+        row_by_product_id = dict(row_by_product_id)
+        for row in range(len(product_ids), len(new_product_ids)):
+            product_id = int(new_product_ids[row])
+            if product_id < 0:
+                continue
+            previous_row = row_by_product_id.get(product_id)
+            if previous_row is not None:
+                new_product_ids[previous_row] = -1
+            row_by_product_id[product_id] = row
+        return self.remapped(new_product_ids, row_by_product_id)
+
+    def search_images(self, queries: np.ndarray, k: int, exclude: np.ndarray = None):
+        """Top k image rows per query vector, using the store's search mode.
+
+        ``exclude`` is an optional boolean mask over rows. Returns
+        ``(rows, scores)`` of shape ``(n_queries, k)``; approximate results
+        may be padded with -1 rows. The delta segment is always scanned
+        exactly and merged in.
+        """
+        base, delta = self.base_image, self.delta_image
+        base_exclude = exclude[:len(base)] if exclude is not None else None
+
+        if self.ann_index is not None:
+            rows, scores = self.ann_index.search(queries, k, exclude=base_exclude)
+        elif self.quantized is not None:
+            rows, scores = self.quantized.search(queries, k, base, self.rescore_candidates, base_exclude)
+        else:
+            rows, scores = vector_search.exact_search(base, queries, k, base_exclude)
+
+        if not len(delta):
+            return rows, scores
+
+        delta_exclude = exclude[len(base):len(base) + len(delta)] if exclude is not None else None
+        delta_rows, delta_scores = vector_search.exact_search(delta, queries, k, delta_exclude)
+        return vector_search.merge_results(
+            np.concatenate([rows, delta_rows + len(base)], axis=-1),
+            np.concatenate([scores, delta_scores], axis=-1),
+            k,
+        )
+
+    def lookup_neighbours(self, seed_rows, k: int, exclude: np.ndarray = None):
+        """Each seed's top k rows from the precomputed neighbour table.
+
+        The table only knows the rows that existed when it was built; rows
+        appended or compacted since are scanned exactly and merged in by
+        score, and excluded rows are skipped, so every seed gets the same k
+        rows an exact search would rank (padded with -1 if the table runs
+        out). Returns ``(rows, scores)`` of shape ``(n_seeds, k)``, or None
+        when there is no table or it does not cover the seeds.
+        """
+        neighbours = self.neighbours
+        if neighbours is None or not neighbours.covers(seed_rows, k):
+            return None
+
+        seed_rows = np.asarray(seed_rows, dtype=np.int64)
+        # Read past k so excluded neighbours don't leave the list short
+        rows, scores = neighbours.lookup(seed_rows, neighbours.n_neighbours)
+        if exclude is not None:
+            scores[exclude[rows]] = -np.inf
+
+        image_embeddings = self.image_embeddings
+        covered, n_rows = len(neighbours), len(image_embeddings)
+        if covered < n_rows:
+            tail_exclude = exclude[covered:n_rows] if exclude is not None else None
+            tail_rows, tail_scores = vector_search.exact_search(
+                image_embeddings[np.arange(covered, n_rows)], image_embeddings[seed_rows], k, tail_exclude
+            )
+            rows = np.concatenate([rows, tail_rows + covered], axis=-1)
+            scores = np.concatenate([scores, tail_scores.astype(np.float32)], axis=-1)
+
+        rows, scores = vector_search.merge_results(rows, scores, k)
+        rows[~np.isfinite(scores)] = -1
+        return rows, scores
+
+    def _build_index(self, metadata: pd.DataFrame):
+        """Map image filenames and product ids to embedding rows and back."""
+        image_names = metadata["image_path"].astype(str).str.rsplit("/", n=1).str[-1]
+        stems = image_names.str.rsplit(".", n=1).str[0]
+
+        # Catalog images are named after their product id, e.g. 886029004.jpg;
+        # appended rows record their product id explicitly
+        product_ids = pd.to_numeric(stems, errors="coerce")
+        if "product_id" in metadata:
+            product_ids = pd.to_numeric(metadata["product_id"], errors="coerce").fillna(product_ids)
+        # A re-imaged product maps to its newest row only
+        product_ids = product_ids.mask(product_ids.duplicated(keep="last"))
+
+        self.image_names = image_names.to_numpy()
+        self.thumbnails = ("/products/" + image_names).to_numpy()
+        self.product_ids = product_ids.fillna(-1).to_numpy(dtype=np.int64, copy=True)
+
+        self.row_by_image_name = {name: row for row, name in enumerate(self.image_names)}
+        self.row_by_product_id = {
+            int(product_id): row
+            for row, product_id in enumerate(self.product_ids)
+            if product_id >= 0
+        }
+
+    def row_for_thumbnail(self, thumbnail: str) -> Optional[int]:
+        """Embedding row for a product thumbnail path such as /products/123.jpg"""
+        if not thumbnail:
+            return None
+        return self.row_by_image_name.get(os.path.basename(thumbnail))
+
+    def row_for_product_id(self, product_id: int) -> Optional[int]:
+        return self.row_by_product_id.get(product_id)
+
+    def product_ids_for_rows(self, rows: Iterable[int]) -> List[int]:
+        """Product ids for embedding rows in the same order, skipping unmapped rows"""
+        product_ids = self.product_ids[np.asarray(list(rows), dtype=np.int64)]
+        return product_ids[product_ids >= 0].tolist()
+
+    def thumbnails_for_rows(self, rows: Iterable[int]) -> List[str]:
+        """Product thumbnail paths for embedding rows, preserving their order."""
+        return self.thumbnails[np.asarray(list(rows), dtype=np.int64)].tolist()
+
+
+class EmbeddingStore:
+    """Process-wide holder for the catalog embeddings and their metadata.
+
+    The embedding matrices are opened with ``mmap_mode`` so every worker
+    process maps the same file pages from the OS page cache instead of
+    keeping a private copy of each array.
+
+    ``search_mode`` selects how ``search_images`` finds neighbours: ``exact``
+    scores the whole matrix, ``ann`` probes an IVF index, and ``float16`` /
+    ``int8`` scan a quantized copy and rescore the best candidates exactly.
+
+    Products added after the base files were built are appended to a small
+    delta segment (kept in memory and persisted under ``delta_dir``) and get
+    the rows after the base. ``compact`` later merges the delta into new
+    base files under ``data_dir``, which take over from the shipped files
+    from then on, so row numbers never change and the checked-in files are
+    never rewritten.
+    """
+
+    def __init__(self, image_embeddings_path: str, text_embeddings_path: str,
+                 metadata_path: str, mmap_mode: str = "r", search_mode: str = "exact",
+                 ann_index_path: str = None, ann_nprobe: int = 8,
+                 neighbour_table_path: str = None, rescore_candidates: int = 200,
+                 delta_dir: str = None, data_dir: str = None):
+        self.image_embeddings_path = image_embeddings_path
+        self.text_embeddings_path = text_embeddings_path
+        self.metadata_path = metadata_path
+        self.mmap_mode = mmap_mode or None
+        self.search_mode = search_mode
+        self.ann_index_path = ann_index_path
+        self.ann_nprobe = ann_nprobe
+        self.neighbour_table_path = neighbour_table_path
+        self.rescore_candidates = rescore_candidates
+        self.delta_dir = delta_dir or None
+        self.data_dir = data_dir or None
+
+        # The current EmbeddingSnapshot; replaced, never modified
+        self.snapshot = None
+        self.ann_index = None
+        self.quantized = None
+        self.neighbours = None
+
+        self._base_image = None
+        self._base_text = None
+        self._base_metadata = None
+        self._base_mtime = None
+        self._delta_image = None
+        self._delta_text = None
+        self._delta_metadata = None
+        self._delta_mtime = None
+
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.snapshot is not None
+
+    # Single reads of the current snapshot; requests combining several should take ``snapshot`` once
+    @property
+    def image_embeddings(self):
+        return self.snapshot.image_embeddings
+
+    @property
+    def text_embeddings(self):
+        return self.snapshot.text_embeddings
+
+    @property
+    def metadata(self) -> pd.DataFrame:
+        return self.snapshot.metadata
+
+    @property
+    def product_ids(self) -> np.ndarray:
+        return self.snapshot.product_ids
+
+    def search_images(self, queries: np.ndarray, k: int, exclude: np.ndarray = None):
+        return self.snapshot.search_images(queries, k, exclude)
+
+    def lookup_neighbours(self, seed_rows, k: int, exclude: np.ndarray = None):
+        return self.snapshot.lookup_neighbours(seed_rows, k, exclude)
+
+    def row_for_thumbnail(self, thumbnail: str) -> Optional[int]:
+        return self.snapshot.row_for_thumbnail(thumbnail)
+
+    def row_for_product_id(self, product_id: int) -> Optional[int]:
+        return self.snapshot.row_for_product_id(product_id)
+
+    def product_ids_for_rows(self, rows: Iterable[int]) -> List[int]:
+        return self.snapshot.product_ids_for_rows(rows)
+
+    def thumbnails_for_rows(self, rows: Iterable[int]) -> List[str]:
+        return self.snapshot.thumbnails_for_rows(rows)
+
+    def load(self) -> "EmbeddingStore":
+        """Load the embeddings and catalog once; later calls are no-ops."""
+        if self.loaded:
+            return self
+
+        if self.search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown vector search mode '{self.search_mode}', expected one of {SEARCH_MODES}")
+
+        with self._delta_lock(shared=True), self._lock:
+            if self.loaded:
+                return self
+
+            self._load_base()
+            self._load_delta()
+            self._update_views()
+
+        logger.info(f"Embedding store loaded with {len(self.metadata)} rows ({self.delta_rows} in the delta)")
+        return self
+
+    @property
+    def base_rows(self) -> int:
+        return len(self._base_image)
+
+    @property
+    def delta_rows(self) -> int:
+        return len(self._delta_image) if self._delta_image is not None else 0
+
+    def base_paths(self):
+        """Image, text and metadata files of the base: the compacted ones once they exist"""
+        if self.data_dir:
+            paths = self._compacted_paths()
+            # Metadata is replaced last, so it marks a complete compacted base
+            if os.path.exists(paths[2]):
+                return paths
+        return self.image_embeddings_path, self.text_embeddings_path, self.metadata_path
+
+    def _compacted_paths(self):
+        return (
+            os.path.join(self.data_dir, "image_embeddings.npy"),
+            os.path.join(self.data_dir, "text_embeddings.npy"),
+            os.path.join(self.data_dir, "metadata.csv"),
+        )
+
+    def _load_base(self):
+        image_path, text_path, metadata_path = self.base_paths()
+        image_embeddings = np.load(image_path, mmap_mode=self.mmap_mode)
+        text_embeddings = np.load(text_path, mmap_mode=self.mmap_mode)
+        metadata = pd.read_csv(metadata_path)
+
+        if not (len(metadata) == len(image_embeddings) == len(text_embeddings)):
+            raise ValueError(
+                f"Embedding store is inconsistent: {len(metadata)} metadata rows, "
+                f"{len(image_embeddings)} image and {len(text_embeddings)} text embeddings"
+            )
+
+        ann_index, quantized = None, None
+        if self.search_mode == "ann":
+            ann_index = self._load_ann_index(image_embeddings)
+        elif self.search_mode in QUANTIZATIONS:
+            quantized = self.quantized
+            if quantized is not None and len(quantized) <= len(image_embeddings):
+                # Rows are only ever appended, so quantize just the new tail with the existing scale
+                quantized = QuantizedMatrix(quantized.codes, quantized.scale)
+                quantized.append(image_embeddings[len(quantized):])
+            else:
+                quantized = QuantizedMatrix.quantize(image_embeddings, self.search_mode)
+
+        self.ann_index = ann_index
+        self.quantized = quantized
+        self.neighbours = self._load_neighbours(len(image_embeddings))
+        self._base_image = image_embeddings
+        self._base_text = text_embeddings
+        self._base_metadata = metadata
+        self._base_mtime = _mtime(metadata_path)
+
+    def _load_ann_index(self, image_embeddings: np.ndarray) -> IVFIndex:
+        if self.ann_index_path and os.path.exists(self.ann_index_path):
+            index = IVFIndex.load(self.ann_index_path, image_embeddings, self.ann_nprobe)
+            if len(index) < len(image_embeddings):
+                index.add(np.arange(len(index), len(image_embeddings)))
+            if len(index) == len(image_embeddings):
+                return index
+
+            logger.warning(
+                f"IVF index at {self.ann_index_path} covers {len(index)} rows but the embeddings "
+                f"have {len(image_embeddings)}; building a new one in memory"
+            )
+            return IVFIndex.build(image_embeddings, nprobe=self.ann_nprobe)
+
+        logger.warning(
+            f"No IVF index at {self.ann_index_path}, building one in memory; "
+            "run `python -m app.commands.build_ann_index` to persist it"
+        )
+        return IVFIndex.build(image_embeddings, nprobe=self.ann_nprobe)
+
+    def _load_neighbours(self, n_rows: int) -> Optional[NeighbourTable]:
+        if not self.neighbour_table_path or not NeighbourTable.exists(self.neighbour_table_path):
+            return None
+
+        neighbours = NeighbourTable.load(self.neighbour_table_path, self.mmap_mode)
+        if len(neighbours) > n_rows:
+            logger.warning(
+                f"Neighbour table {self.neighbour_table_path} covers {len(neighbours)} rows but the "
+                f"embeddings have {n_rows}; ignoring it until it is rebuilt"
+            )
+            return None
+        # A shorter table predates appended products; it still serves the rows it covers
+        return neighbours
+
+    def _delta_paths(self):
+        return (
+            os.path.join(self.delta_dir, "image_embeddings.npy"),
+            os.path.join(self.delta_dir, "text_embeddings.npy"),
+            os.path.join(self.delta_dir, "metadata.csv"),
+        )
+
+    @contextmanager
+    def _delta_lock(self, shared: bool = False):
+        """File lock serialising delta writes and compaction across worker processes"""
+        if not self.delta_dir:
+            yield
+            return
+
+        os.makedirs(self.delta_dir, exist_ok=True)
+        with open(os.path.join(self.delta_dir, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_delta(self):
+        dimension = self._base_image.shape[1]
+        image_path, text_path, metadata_path = self._delta_paths() if self.delta_dir else (None, None, None)
+
+        if metadata_path and os.path.exists(metadata_path):
+            image_embeddings = np.load(image_path)
+            text_embeddings = np.load(text_path)
+            metadata = pd.read_csv(metadata_path)
+            if not (len(metadata) == len(image_embeddings) == len(text_embeddings)):
+                raise ValueError(
+                    f"Embedding delta in {self.delta_dir} is inconsistent: {len(metadata)} metadata rows, "
+                    f"{len(image_embeddings)} image and {len(text_embeddings)} text embeddings"
+                )
+        else:
+            image_embeddings = np.empty((0, dimension), dtype=np.float32)
+            text_embeddings = np.empty((0, self._base_text.shape[1]), dtype=np.float32)
+            metadata = pd.DataFrame(columns=["image_path", "description", "product_id"])
+
+        self._delta_image = image_embeddings
+        self._delta_text = text_embeddings
+        self._delta_metadata = metadata
+        self._delta_mtime = _mtime(metadata_path) if metadata_path else None
+
+    def _save_delta(self):
+        if not self.delta_dir:
+            return
+
+        # Metadata goes last: readers treat it as the marker of a complete delta
+        image_path, text_path, metadata_path = self._delta_paths()
+        for path, array in ((image_path, self._delta_image), (text_path, self._delta_text)):
+            np.save(f"{path}.tmp.npy", array)
+            os.replace(f"{path}.tmp.npy", path)
+        self._delta_metadata.to_csv(f"{metadata_path}.tmp", index=False)
+        os.replace(f"{metadata_path}.tmp", metadata_path)
+        self._delta_mtime = _mtime(metadata_path)
+
+    def _update_views(self, keep_mapping: bool = False):
+        """Publish base + delta as a new snapshot.
+
+        With ``keep_mapping`` the current (possibly database-synced) product
+        mapping is carried over to it.
+        """
+        if self.delta_rows:
+            metadata = pd.concat([self._base_metadata, self._delta_metadata], ignore_index=True)
+        else:
+            metadata = self._base_metadata
+
+        snapshot = EmbeddingSnapshot(
+            self._base_image, self._base_text, self._delta_image, self._delta_text, metadata,
+            self.search_mode, self.ann_index, self.quantized, self.neighbours, self.rescore_candidates,
+        )
+        if keep_mapping and self.snapshot is not None:
+            snapshot = snapshot.carry_mapping(self.snapshot)
+        self.snapshot = snapshot
+
+    def append(self, image_name: str, description: str, image_vector: np.ndarray,
+               text_vector: np.ndarray, product_id: int = None) -> int:
+        """Add one product image to the delta segment and return its row.
+
+        A product that already had a row (a re-imaged product) is moved to
+        the new row; the old one stays in the matrices but maps to nothing.
+        """
+        with self._delta_lock(), self._lock:
+            # Another worker may have appended since we last looked
+            if self.delta_dir and _mtime(self._delta_paths()[2]) != self._delta_mtime:
+                self._load_delta()
+
+            row = self.base_rows + self.delta_rows
+            self._delta_image = np.vstack([self._delta_image, np.asarray(image_vector, dtype=np.float32).reshape(1, -1)])
+            self._delta_text = np.vstack([self._delta_text, np.asarray(text_vector, dtype=np.float32).reshape(1, -1)])
+            self._delta_metadata = pd.concat([self._delta_metadata, pd.DataFrame([{
+                "image_path": image_name, "description": description, "product_id": product_id,
+            }])], ignore_index=True)
+            self._save_delta()
+            self._update_views(keep_mapping=True)
+
+        logger.info(f"Appended product {product_id} to the embedding delta at row {row}")
+        return row
+
+    def refresh(self) -> bool:
+        """Pick up delta appends and compactions made by other worker processes.
+
+        Returns True if anything was reloaded.
+        """
+        if not self.loaded:
+            return False
+
+        with self._delta_lock(shared=True):
+            delta_mtime = _mtime(self._delta_paths()[2]) if self.delta_dir else None
+            if _mtime(self.base_paths()[2]) == self._base_mtime and delta_mtime == self._delta_mtime:
+                return False
+
+            with self._lock:
+                if _mtime(self.base_paths()[2]) != self._base_mtime:
+                    self._load_base()
+                self._load_delta()
+                self._update_views(keep_mapping=True)
+
+        logger.info(f"Embedding store refreshed: {self.base_rows} base rows, {self.delta_rows} delta rows")
+        return True
+
+    def compact(self, batch_size: int = 65536) -> int:
+        """Merge the delta segment into the base and return the merged row count.
+
+        The merged base is streamed into ``data_dir`` and swapped in with
+        ``os.replace``, so readers keep their old mapping until they refresh.
+        Existing rows keep their numbers. Without a ``data_dir`` nothing is
+        compacted and the delta keeps growing.
+        """
+        if not self.data_dir:
+            return 0
+
+        with self._delta_lock(), self._lock:
+            self._load_delta()
+            n_delta = self.delta_rows
+            if not n_delta:
+                return 0
+
+            os.makedirs(self.data_dir, exist_ok=True)
+            image_path, text_path, metadata_path = self._compacted_paths()
+            paths = []
+            for path, base, delta in ((image_path, self._base_image, self._delta_image),
+                                      (text_path, self._base_text, self._delta_text)):
+                tmp_path = f"{path}.tmp.npy"
+                merged = np.lib.format.open_memmap(
+                    tmp_path, mode="w+", dtype=np.float32, shape=(len(base) + n_delta, base.shape[1]),
+                )
+                for start in range(0, len(base), batch_size):
+                    end = min(start + batch_size, len(base))
+                    merged[start:end] = base[start:end]
+                merged[len(base):] = delta
+                merged.flush()
+                del merged
+                paths.append((tmp_path, path))
+
+            metadata_tmp_path = f"{metadata_path}.tmp"
+            pd.concat([self._base_metadata, self._delta_metadata], ignore_index=True).to_csv(
+                metadata_tmp_path, index=False,
+            )
+            paths.append((metadata_tmp_path, metadata_path))
+
+            if self.ann_index is not None and self.ann_index_path:
+                # Persist the grown index first so other workers find it when they see the new base
+                index = IVFIndex(self.ann_index.centroids, self.ann_index.list_offsets,
+                                 self.ann_index.list_rows, self.ann_index.vectors, self.ann_index.nprobe)
+                index.add(np.arange(self.base_rows, self.base_rows + n_delta),
+                          np.load(paths[0][0], mmap_mode=self.mmap_mode))
+                index.save(f"{self.ann_index_path}.tmp.npz")
+                os.replace(f"{self.ann_index_path}.tmp.npz", self.ann_index_path)
+
+            for tmp_path, path in paths:
+                os.replace(tmp_path, path)
+            for path in self._delta_paths():
+                os.remove(path)
+
+            self._load_base()
+            self._load_delta()
+            self._update_views(keep_mapping=True)
+
+        logger.info(f"Compacted {n_delta} delta rows into the base embeddings ({self.base_rows} rows)")
+        return n_delta
+
+    def sync_product_ids(self, db) -> int:
+        """Take the row <-> product_id mapping from ``Product.embedding_row``.
+
+        Replaces the filename-derived mapping once the sync command has
+        populated the column. Returns the number of mapped products; 0
+        (keeping the filename mapping) when the column does not exist yet.
+        """
+        try:
+            mapping = (
+                db.query(Product.product_id, Product.embedding_row)
+                .filter(Product.embedding_row.isnot(None))
+                .all()
+            )
+        except (ProgrammingError, OperationalError):
+            db.rollback()
+            logger.warning(
+                "products.embedding_row does not exist yet, falling back to image filenames; "
+                "run `python -m app.commands.sync_embedding_rows`"
+            )
+            return 0
+        if not mapping:
+            logger.warning(
+                "No products have an embedding_row yet, falling back to image filenames; "
+                "run `python -m app.commands.sync_embedding_rows`"
+            )
+            return 0
+
+        with self._lock:
+            snapshot = self.snapshot
+            product_ids = np.full(len(snapshot), -1, dtype=np.int64)
+            row_by_product_id = {}
+            for product_id, row in mapping:
+                if 0 <= row < len(product_ids):
+                    product_ids[row] = product_id
+                    row_by_product_id[product_id] = row
+            self.snapshot = snapshot.remapped(product_ids, row_by_product_id)
+        return len(row_by_product_id)
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+embedding_store = EmbeddingStore(
+    settings.IMAGE_EMBEDDINGS_PATH,
+    settings.TEXT_EMBEDDINGS_PATH,
+    settings.METADATA_PATH,
+    settings.EMBEDDINGS_MMAP_MODE,
+    settings.VECTOR_SEARCH_MODE,
+    settings.ANN_INDEX_PATH,
+    settings.ANN_NPROBE,
+    settings.NEIGHBOUR_TABLE_PATH,
+    settings.QUANTIZED_RESCORE_CANDIDATES,
+    settings.EMBEDDINGS_DELTA_DIR,
+    settings.EMBEDDINGS_DATA_DIR,
+)
+
+
+def get_embedding_store() -> EmbeddingStore:
+    """Return the shared store, loading it on first use outside the app lifespan."""
+    return embedding_store.load()
@@ -0,0 +1,52 @@
+import importlib
+import threading
+from typing import List
+
+import numpy as np
+
+from app.core.config import settings
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class FashionCLIPEncoder:
+    """The FashionCLIP model the shipped embeddings were produced with.
+
+    ``fashion-clip`` (and its torch stack) is an optional dependency and is
+    only imported when the first product needs encoding.
+    """
+
+    dimension = 512
+
+    def __init__(self, model_name: str = "fashion-clip", batch_size: int = 32):
+        from fashion_clip.fashion_clip import FashionCLIP
+
+        self.model = FashionCLIP(model_name)
+        self.batch_size = batch_size
+
+    def encode_images(self, images: List) -> np.ndarray:
+        """Unit-norm float32 embeddings, one row per image file path or PIL image"""
+        return normalize(self.model.encode_images(images, batch_size=self.batch_size))
+
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Unit-norm float32 embeddings, one row per text"""
+        return normalize(self.model.encode_text(texts, batch_size=self.batch_size))
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """The encoder class named by EMBEDDING_ENCODER, instantiated once per process"""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                module_name, class_name = settings.EMBEDDING_ENCODER.rsplit(".", 1)
+                _encoder = getattr(importlib.import_module(module_name), class_name)()
+    return _encoder
@@ -0,0 +1,81 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.embeddings import EmbeddingSnapshot
+from app.core.sampling import ProductIdPool, product_id_pool
+from app.models.models import Order, OrderItem, ProductFeedback
+
+
+class AvailabilityMask:
+    """Catalog-wide boolean mask of embedding rows whose product can be recommended.
+
+    Built with one ``np.isin`` from the pool of in-stock, published product
+    ids, and rebuilt only when the pool reloads or the store's row mapping
+    changes.
+    """
+
+    def __init__(self, pool: ProductIdPool):
+        self.pool = pool
+        self._source = (None, None)
+        self._mask = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, store: EmbeddingSnapshot) -> np.ndarray:
+        available_ids, product_ids = self.pool.ids(db), store.product_ids
+        source = self._source
+        if source[0] is not available_ids or source[1] is not product_ids:
+            with self._lock:
+                if self._source is source:
+                    self._mask = np.isin(product_ids, available_ids)
+                    self._source = (available_ids, product_ids)
+        return self._mask
+
+
+def excluded_product_ids(db: Session, user_id: int) -> np.ndarray:
+    """Products the user already liked, disliked or ordered, from one query"""
+    return excluded_product_ids_by_user(db, [user_id]).get(user_id, np.empty(0, dtype=np.int64))
+
+
+def excluded_product_ids_by_user(db: Session, user_ids: Iterable[int]) -> Dict[int, np.ndarray]:
+    """``excluded_product_ids`` for many users from one query; users with none are left out"""
+    user_ids = list(user_ids)
+    feedback = db.query(ProductFeedback.user_id, ProductFeedback.product_id).filter(
+        ProductFeedback.user_id.in_(user_ids)
+    )
+    ordered = (
+        db.query(Order.user_id, OrderItem.product_id)
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.user_id.in_(user_ids), Order.status != "cancelled")
+    )
+    product_ids = defaultdict(list)
+    for user_id, product_id in feedback.union(ordered):
+        product_ids[user_id].append(product_id)
+    return {user_id: np.asarray(ids, dtype=np.int64) for user_id, ids in product_ids.items()}
+
+
+def excluded_rows(store: EmbeddingSnapshot, product_ids: Iterable[int]) -> List[int]:
+    """Embedding rows of ``product_ids``, skipping products without one"""
+    rows = [store.row_for_product_id(int(product_id)) for product_id in product_ids]
+    return [row for row in rows if row is not None]
+
+
+def exclusion_mask(db: Session, store: EmbeddingSnapshot, user_id: int, product_ids: np.ndarray = None) -> np.ndarray:
+    """Boolean mask over embedding rows to drop before top-k for ``user_id``.
+
+    True for rows whose product is unavailable and for the user's own
+    liked, disliked and ordered products (``product_ids``, looked up if
+    not given).
+    """
+    if product_ids is None:
+        product_ids = excluded_product_ids(db, user_id)
+
+    mask = ~availability_mask.get(db, store)
+    mask[excluded_rows(store, product_ids)] = True
+    return mask
+
+
+availability_mask = AvailabilityMask(product_id_pool)
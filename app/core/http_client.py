@@ -0,0 +1,98 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+
+
+class SearchAPIClient:
+    """Shared async HTTP client for the external search service.
+
+    One ``httpx.AsyncClient`` per worker keeps connections alive between
+    searches instead of opening a new TCP/TLS connection each time. A
+    semaphore caps the requests in flight so a slow upstream queues
+    searches here rather than piling up sockets. Created and closed by the
+    app lifespan; ``post`` starts it lazily for use outside the app.
+    """
+
+    def __init__(self, base_url: str, timeout: float, connect_timeout: float,
+                 max_connections: int, max_keepalive: int, max_concurrency: int):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.max_concurrency = max_concurrency
+
+        self._client = None
+        self._semaphore = None
+
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.waiting = 0
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        await self.start()
+
+        # A search cancelled while queued leaves without entering the semaphore
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            return await self._client.post(path, **kwargs)
+        except httpx.TimeoutException:
+            self.timeouts += 1
+            raise
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.requests += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        connections = self._connections()
+        return {
+            "base_url": self.base_url,
+            "started": self._client is not None,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "max_concurrency": self.max_concurrency,
+            "connections": len(connections),
+            "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+    def _connections(self) -> list:
+        # httpx does not expose its pool publicly; read it from the transport when available
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        return list(getattr(pool, "connections", []))
+
+
+search_api_client = SearchAPIClient(
+    settings.SEARCH_API_URL,
+    settings.SEARCH_API_TIMEOUT,
+    settings.SEARCH_API_CONNECT_TIMEOUT,
+    settings.SEARCH_API_MAX_CONNECTIONS,
+    settings.SEARCH_API_MAX_KEEPALIVE,
+    settings.SEARCH_API_MAX_CONCURRENCY,
+)
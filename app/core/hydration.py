@@ -0,0 +1,43 @@
+import logging
+from typing import List, Sequence, Tuple
+
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.models.models import Product
+
+logger = logging.getLogger(__name__)
+
+# What search results and recommendation cards show
+CARD_COLUMNS = (
+    Product.product_id, Product.title, Product.description, Product.price, Product.thumbnail, Product.images,
+)
+
+# The fields of schemas.products.ProductBase, for listings nesting full products
+LISTING_COLUMNS = CARD_COLUMNS + (
+    Product.discount_percentage, Product.rating, Product.stock, Product.is_published,
+    Product.category_id, Product.brand_id, Product.gender, Product.sizes,
+)
+
+
+def hydrate_products(db: Session, product_ids: Sequence[int],
+                     columns: Sequence = CARD_COLUMNS) -> Tuple[List[Row], List[int]]:
+    """Load ``columns`` of ranked products in one query, keeping the ranking.
+
+    Returns ``(rows, missing)``: rows follow the order of ``product_ids``
+    (repeats dropped) and ``missing`` lists the ids with no product, e.g.
+    deleted since an index or cache ranked them. Those are logged and left
+    out rather than failing the request.
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        return [], []
+
+    columns = (Product.product_id,) + tuple(column for column in columns if column is not Product.product_id)
+    rows = db.query(*columns).filter(Product.product_id.in_(product_ids)).all()
+    rows_by_id = {row.product_id: row for row in rows}
+
+    missing = [product_id for product_id in product_ids if product_id not in rows_by_id]
+    if missing:
+        logger.warning(f"{len(missing)} of {len(product_ids)} ranked products not found: {missing[:20]}")
+    return [rows_by_id[product_id] for product_id in product_ids if product_id in rows_by_id], missing
@@ -0,0 +1,104 @@
+import asyncio
+import fcntl
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.core.config import settings
+from app.core.embeddings import EmbeddingStore, embedding_store
+from app.core.encoders import get_encoder
+from app.db.database import SessionLocal
+from app.models.models import Product
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = "uploads"
+
+
+class EmbeddingIndexer:
+    """Keeps the embedding store current as products are created or re-imaged.
+
+    New thumbnails are encoded on a single background thread, so requests
+    never wait on the model, and appended to the store's delta segment.
+    ``maintain`` runs periodically in every worker: it picks up rows other
+    workers appended and compacts the delta once it is large enough.
+    """
+
+    def __init__(self, store: EmbeddingStore, enabled: bool = True, compaction_min_rows: int = 1000):
+        self.store = store
+        self.enabled = enabled
+        self.compaction_min_rows = compaction_min_rows
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-indexer")
+
+    def enqueue(self, product_id: int, thumbnail: str, description: str = None) -> Future:
+        """Schedule a product's thumbnail for encoding; returns None when disabled"""
+        if not self.enabled or not thumbnail:
+            return None
+        return self._executor.submit(self._index_product, product_id, thumbnail, description)
+
+    def _index_product(self, product_id: int, thumbnail: str, description: str = None):
+        try:
+            encoder = get_encoder()
+            image_vector = encoder.encode_images([os.path.join(UPLOADS_DIR, thumbnail.lstrip("/"))])[0]
+            text_vector = encoder.encode_texts([description or ""])[0]
+
+            store = self.store.load()
+            row = store.append(os.path.basename(thumbnail), description, image_vector, text_vector, product_id)
+
+            with SessionLocal() as db:
+                try:
+                    db.query(Product).filter(Product.product_id == product_id).update(
+                        {Product.embedding_row: row}, synchronize_session=False,
+                    )
+                    db.commit()
+                except (ProgrammingError, OperationalError):
+                    # Unmigrated database: the store still maps the row through the delta metadata
+                    db.rollback()
+                    logger.warning(
+                        f"Could not record embedding row {row} of product {product_id}; "
+                        "run `python -m app.commands.sync_embedding_rows`"
+                    )
+            return row
+        except Exception:
+            logger.exception(f"Failed to index the thumbnail of product {product_id}")
+
+    def maintain(self) -> int:
+        """Refresh from other workers' changes and compact a large delta; returns rows compacted"""
+        if not self.store.loaded:
+            return 0
+
+        self.store.refresh()
+        if not self.store.delta_dir or self.store.delta_rows < self.compaction_min_rows:
+            return 0
+
+        # Only one worker compacts; the others pick the new base up on their next refresh
+        with open(os.path.join(self.store.delta_dir, ".compaction.lock"), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            try:
+                return self.store.compact()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def run_maintenance(self, interval: float):
+        """Call ``maintain`` every ``interval`` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.maintain)
+            except Exception:
+                logger.exception("Embedding store maintenance failed")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+embedding_indexer = EmbeddingIndexer(
+    embedding_store,
+    settings.EMBEDDINGS_INCREMENTAL_INDEXING,
+    settings.EMBEDDINGS_COMPACTION_MIN_ROWS,
+)
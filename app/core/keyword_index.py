@@ -0,0 +1,337 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.vector_search import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has in is it its of on or that the this to with your you
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lower-cased alphanumeric tokens without stopwords"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def stem(token: str) -> str:
+    """Light plural stemming: dresses -> dress, shirts -> shirt, hoodies -> hoody"""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("sses", "shes", "ches", "xes", "zes")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def analyze(text: Optional[str]) -> List[str]:
+    """Stemmed tokens, the terms BM25Index indexes and searches"""
+    return [stem(token) for token in tokenize(text)]
+
+
+class BM25Index:
+    """In-memory inverted index ranking products with Okapi BM25.
+
+    Postings are kept per term as ``{slot: term frequency}`` so products can
+    be added, replaced and removed one at a time; each term's postings are
+    turned into NumPy arrays on first use after a change, and a query is
+    scored with one vectorized pass per query term. Title tokens count
+    ``title_weight`` times so title matches outrank description matches.
+
+    Terms are stemmed plurals, and the last word of a query that does not
+    end in a space also matches as a prefix (of up to ``max_prefix_terms``
+    terms), so results keep up while the user types: "dre" finds "Dresses".
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: int = 2, max_prefix_terms: int = 50):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.max_prefix_terms = max_prefix_terms
+
+        self._postings = {}
+        self._arrays = {}
+        self._doc_terms = {}
+        # Sorted terms for prefix lookups, rebuilt after the vocabulary changes
+        self._vocabulary = None
+        self._slot_by_product_id = {}
+        self._product_ids = np.empty(0, dtype=np.int64)
+        self._doc_lengths = np.empty(0, dtype=np.float32)
+        self._free_slots = []
+        self._total_length = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slot_by_product_id)
+
+    def _terms(self, title: str, *texts: str) -> Counter:
+        terms = Counter()
+        for token in analyze(title):
+            terms[token] += self.title_weight
+        for text in texts:
+            terms.update(analyze(text))
+        return terms
+
+    def add(self, product_id: int, title: str, *texts: str):
+        """Index a product, replacing any previous version of it"""
+        terms = self._terms(title, *texts)
+        with self._lock:
+            self._remove(product_id)
+
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = len(self._slot_by_product_id)
+                if slot >= len(self._product_ids):
+                    capacity = max(1024, 2 * len(self._product_ids))
+                    self._product_ids = np.resize(self._product_ids, capacity)
+                    self._doc_lengths = np.concatenate([
+                        self._doc_lengths, np.zeros(capacity - len(self._doc_lengths), dtype=np.float32),
+                    ])
+
+            length = sum(terms.values())
+            self._slot_by_product_id[product_id] = slot
+            self._product_ids[slot] = product_id
+            self._doc_lengths[slot] = length
+            self._doc_terms[slot] = tuple(terms)
+            self._total_length += length
+
+            for term, frequency in terms.items():
+                if term not in self._postings:
+                    self._postings[term] = {}
+                    self._vocabulary = None
+                self._postings[term][slot] = frequency
+                self._arrays.pop(term, None)
+
+    def remove(self, product_id: int):
+        with self._lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id: int):
+        slot = self._slot_by_product_id.pop(product_id, None)
+        if slot is None:
+            return
+
+        for term in self._doc_terms.pop(slot):
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+                self._vocabulary = None
+            self._arrays.pop(term, None)
+
+        self._total_length -= self._doc_lengths[slot]
+        self._doc_lengths[slot] = 0
+        self._free_slots.append(slot)
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if postings is None:
+                return None
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        """Indexed terms starting with ``prefix``, those in the most products first"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+
+        terms = []
+        for position in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+            if not vocabulary[position].startswith(prefix):
+                break
+            terms.append(vocabulary[position])
+        if len(terms) > self.max_prefix_terms:
+            terms.sort(key=lambda term: len(self._postings[term]), reverse=True)
+            terms = terms[:self.max_prefix_terms]
+        return terms
+
+    def _term_scores(self, term: str, n_docs: int, average_length: float):
+        """``(slots, BM25 scores)`` of the products containing ``term``"""
+        arrays = self._term_arrays(term)
+        if arrays is None:
+            return None
+
+        slots, frequencies = arrays
+        idf = np.log1p((n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[slots] / average_length)
+        return slots, idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+
+    def search(self, query: str, offset: int = 0, limit: int = 10) -> Tuple[int, List[int]]:
+        """``(total matches, product ids of the requested page)``, best first"""
+        tokens = tokenize(query)
+        # A last word not followed by anything may still be being typed
+        prefix = tokens.pop() if tokens and query and not query[-1].isspace() else None
+        terms = {stem(token) for token in tokens}
+        with self._lock:
+            n_docs = len(self._slot_by_product_id)
+            if not (terms or prefix) or not n_docs:
+                return 0, []
+
+            average_length = self._total_length / n_docs
+            scores = np.zeros(len(self._doc_lengths), dtype=np.float32)
+            for term in terms:
+                term_scores = self._term_scores(term, n_docs, average_length)
+                if term_scores is not None:
+                    slots, values = term_scores
+                    scores[slots] += values
+
+            if prefix:
+                # A product matching several completions counts its best one, like a single term
+                prefix_scores = np.zeros_like(scores)
+                for term in set(self._prefix_terms(prefix)) | {stem(prefix)}:
+                    term_scores = self._term_scores(term, n_docs, average_length)
+                    if term_scores is not None:
+                        slots, values = term_scores
+                        prefix_scores[slots] = np.maximum(prefix_scores[slots], values)
+                scores += prefix_scores
+
+            matched = np.flatnonzero(scores)
+            if offset >= len(matched):
+                return len(matched), []
+
+            best = top_k_indices(scores[matched], offset + limit)[offset:]
+            return len(matched), self._product_ids[matched[best]].tolist()
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[tuple], **kwargs) -> "BM25Index":
+        """Build from ``(product_id, title, *texts)`` tuples"""
+        index = cls(**kwargs)
+        for product_id, title, *texts in documents:
+            index.add(product_id, title, *texts)
+        return index
+
+
+class KeywordIndex:
+    """Process-wide BM25 index over product titles and descriptions.
+
+    Descriptions come from the products table and from the embedding
+    metadata (metadata2.csv), whose descriptions are much richer. The
+    index is built on first use, updated in place when this worker
+    creates, edits or deletes a product, and rebuilt in the background
+    every ``refresh_seconds`` to pick up other workers' changes.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._index = None
+        # Serialises builds
+        self._lock = threading.Lock()
+        # Guards the swap and ``_pending``, the edits made while a build runs
+        self._edits_lock = threading.Lock()
+        self._pending = None
+
+    @staticmethod
+    def _metadata_description(product_id: int) -> Optional[str]:
+        from app.core.embeddings import embedding_store
+
+        snapshot = embedding_store.snapshot
+        if snapshot is None:
+            return None
+        row = snapshot.row_for_product_id(product_id)
+        if row is None or "description" not in snapshot.metadata:
+            return None
+        description = snapshot.metadata.at[row, "description"]
+        return description if isinstance(description, str) else None
+
+    def build(self, db) -> BM25Index:
+        with self._lock:
+            return self._build(db)
+
+    def _build(self, db) -> BM25Index:
+        from app.models.models import Product
+
+        started = time.perf_counter()
+        with self._edits_lock:
+            self._pending = []
+        try:
+            index = BM25Index.from_documents(
+                (product_id, title, description, self._metadata_description(product_id))
+                for product_id, title, description in db.query(Product.product_id, Product.title, Product.description)
+            )
+            # Edits made while the snapshot was read may be missing from it; replaying is idempotent
+            with self._edits_lock:
+                for edit in self._pending:
+                    self._apply(index, edit)
+                self._index = index
+        finally:
+            with self._edits_lock:
+                self._pending = None
+        logger.info(f"Built keyword index over {len(index)} products in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def get(self, db) -> BM25Index:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._build(db)
+        return self._index
+
+    @staticmethod
+    def _apply(index: BM25Index, edit: tuple):
+        """``(product_id,)`` removes a product, ``(product_id, title, *texts)`` indexes it"""
+        if len(edit) == 1:
+            index.remove(*edit)
+        else:
+            index.add(*edit)
+
+    def _edit(self, *edit):
+        with self._edits_lock:
+            if self._pending is not None:
+                self._pending.append(edit)
+            if self._index is not None:
+                self._apply(self._index, edit)
+
+    def add_product(self, product):
+        """Index a created or edited product; a no-op until the index is built"""
+        self._edit(
+            product.product_id, product.title, product.description,
+            self._metadata_description(product.product_id),
+        )
+
+    def remove_product(self, product_id: int):
+        self._edit(product_id)
+
+    async def run_refresh(self):
+        """Rebuild every ``refresh_seconds`` until cancelled"""
+        from app.db.database import SessionLocal
+
+        def rebuild():
+            with SessionLocal() as db:
+                self.build(db)
+
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            if self._index is None:
+                continue
+            try:
+                await asyncio.to_thread(rebuild)
+            except Exception:
+                logger.exception("Keyword index rebuild failed")
+
+
+keyword_index = KeywordIndex(settings.KEYWORD_INDEX_REFRESH_SECONDS)
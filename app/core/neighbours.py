@@ -0,0 +1,85 @@
+import logging
+import os
+
+import numpy as np
+
+from app.core.vector_search import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+
+class NeighbourTable:
+    """Precomputed top-N similar rows for every embedding row.
+
+    Stored as an ``.npy`` pair: ``<prefix>_ids.npy`` (int32) and
+    ``<prefix>_scores.npy`` (float16), both of shape ``(n_rows, n_neighbours)``
+    and sorted best first. Serving a "similar items" list is then a row slice
+    of a memory-mapped array instead of a dot product over the catalog.
+    """
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray):
+        self.ids = ids
+        self.scores = scores
+
+    @property
+    def n_neighbours(self) -> int:
+        return self.ids.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def paths(prefix: str):
+        return f"{prefix}_ids.npy", f"{prefix}_scores.npy"
+
+    @classmethod
+    def exists(cls, prefix: str) -> bool:
+        return all(os.path.exists(path) for path in cls.paths(prefix))
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_neighbours: int = 50, batch_size: int = 1024) -> "NeighbourTable":
+        """Exact top-N neighbours of every row, excluding the row itself"""
+        n_rows = len(vectors)
+        n_neighbours = min(n_neighbours, n_rows - 1)
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        ids = np.empty((n_rows, n_neighbours), dtype=np.int32)
+        scores = np.empty((n_rows, n_neighbours), dtype=np.float16)
+
+        for start in range(0, n_rows, batch_size):
+            stop = min(start + batch_size, n_rows)
+            batch_scores = vectors[start:stop] @ vectors.T
+            batch_scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+            best = top_k_indices(batch_scores, n_neighbours)
+            ids[start:stop] = best
+            scores[start:stop] = np.take_along_axis(batch_scores, best, axis=1)
+
+        logger.info(f"Built neighbour table with {n_neighbours} neighbours for {n_rows} rows")
+        return cls(ids, scores)
+
+    def save(self, prefix: str):
+        ids_path, scores_path = self.paths(prefix)
+        np.save(ids_path, self.ids)
+        np.save(scores_path, self.scores)
+
+    @classmethod
+    def load(cls, prefix: str, mmap_mode: str = "r") -> "NeighbourTable":
+        ids_path, scores_path = cls.paths(prefix)
+        return cls(np.load(ids_path, mmap_mode=mmap_mode), np.load(scores_path, mmap_mode=mmap_mode))
+
+    def covers(self, rows, k: int) -> bool:
+        """Whether the table can answer a top-k lookup for all ``rows``.
+
+        Rows appended after the table was built are not covered until it is rebuilt.
+        """
+        return k <= self.n_neighbours and int(np.max(rows)) < len(self)
+
+    def lookup(self, rows, k: int):
+        """Top k neighbours of each row as ``(ids, scores)`` arrays of shape (len(rows), k)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        k = min(k, self.n_neighbours)
+        return (
+            np.asarray(self.ids[rows, :k], dtype=np.int64),
+            np.asarray(self.scores[rows, :k], dtype=np.float32),
+        )
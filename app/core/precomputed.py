@@ -0,0 +1,137 @@
+import logging
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core import vector_search
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PrecomputedRecommendations:
+    """Top-K recommendation rows per user, produced by the offline batch job.
+
+    Stored as one ``.npz`` file: sorted ``user_ids``, the liked ``seeds`` and
+    recommended ``rows`` per user (int32 embedding rows, padded with -1) and
+    the parameters and timestamp of the run that produced them.
+    """
+
+    def __init__(self, user_ids: np.ndarray, seeds: np.ndarray, rows: np.ndarray,
+                 generated_at: float, top_k: int, aggregation: str, text_weight: float):
+        self.user_ids = user_ids
+        self.seeds = seeds
+        self.rows = rows
+        self.generated_at = generated_at
+        self.top_k = top_k
+        self.aggregation = aggregation
+        self.text_weight = text_weight
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def matches(self, top_k: int, aggregation: str, text_weight: float) -> bool:
+        """Whether a request asks for the same variant this run computed"""
+        return (top_k, aggregation, text_weight) == (self.top_k, self.aggregation, self.text_weight)
+
+    def lookup(self, user_id: int) -> Optional[Tuple[List[int], List[int]]]:
+        """``(seed_rows, recommended_rows)`` for a user, or None if not precomputed"""
+        position = np.searchsorted(self.user_ids, user_id)
+        if position >= len(self.user_ids) or self.user_ids[position] != user_id:
+            return None
+
+        seeds = self.seeds[position]
+        rows = self.rows[position]
+        return seeds[seeds >= 0].tolist(), rows[rows >= 0].tolist()
+
+    def save(self, path: str):
+        # Write next to the target and rename so readers never see a partial file
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path, user_ids=self.user_ids, seeds=self.seeds, rows=self.rows,
+            generated_at=self.generated_at, top_k=self.top_k,
+            aggregation=self.aggregation, text_weight=self.text_weight,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PrecomputedRecommendations":
+        with np.load(path) as data:
+            return cls(
+                data["user_ids"], data["seeds"], data["rows"], float(data["generated_at"]),
+                int(data["top_k"]), str(data["aggregation"]), float(data["text_weight"]),
+            )
+
+
+def recommend_batch(image_embeddings: np.ndarray, text_embeddings: np.ndarray,
+                    seeds_by_user: List[List[int]], top_k: int, aggregation: str,
+                    text_weight: float = 0.0, k: int = None, unavailable: np.ndarray = None,
+                    excluded_rows_by_user: List[List[int]] = None) -> List[np.ndarray]:
+    """Recommendation rows for many users from one stacked matrix product.
+
+    Produces the same rows as the live recommender's exact path: each user
+    gets ``top_k`` rows per seed (or exactly ``k`` rows if given),
+    aggregated across their seeds. The seeds, the ``unavailable`` rows (a
+    boolean mask shared by all users) and each user's
+    ``excluded_rows_by_user`` are masked before top-k, as the live path's
+    exclusion mask is.
+    """
+    offsets = np.cumsum([0] + [len(seeds) for seeds in seeds_by_user])
+    all_seeds = np.concatenate([np.asarray(seeds, dtype=np.int64) for seeds in seeds_by_user])
+    if not len(all_seeds):
+        return [np.empty(0, dtype=np.int64) for _ in seeds_by_user]
+
+    scores = vector_search.blended_scores(
+        image_embeddings, image_embeddings[all_seeds],
+        text_embeddings, text_embeddings[all_seeds] if text_weight else None, text_weight,
+    )
+
+    results = []
+    for user_index, seeds in enumerate(seeds_by_user):
+        if not seeds:
+            results.append(np.empty(0, dtype=np.int64))
+            continue
+
+        user_scores = scores[offsets[user_index]:offsets[user_index + 1]]
+        user_k = k if k is not None else top_k * len(seeds)
+        exclude = unavailable.copy() if unavailable is not None else np.zeros(len(image_embeddings), dtype=bool)
+        exclude[seeds] = True
+        if excluded_rows_by_user is not None:
+            exclude[excluded_rows_by_user[user_index]] = True
+        rows, _ = vector_search.top_k_aggregated(user_scores, user_k, aggregation, exclude=exclude)
+        results.append(rows)
+    return results
+
+
+class PrecomputedRecommendationsFile:
+    """Lazily loads the batch output and picks up new runs without a restart"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._recommendations = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[PrecomputedRecommendations]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    started = time.perf_counter()
+                    self._recommendations = PrecomputedRecommendations.load(self.path)
+                    self._mtime = mtime
+                    logger.info(
+                        f"Loaded precomputed recommendations for {len(self._recommendations)} users "
+                        f"in {time.perf_counter() - started:.3f}s"
+                    )
+        return self._recommendations
+
+
+precomputed_recommendations = PrecomputedRecommendationsFile(settings.PRECOMPUTED_RECOMMENDATIONS_PATH)
@@ -0,0 +1,280 @@
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import Product
+from app.schemas.filters import ProductFilters
+
+GENDERS = ("men", "women", "unisex")
+
+FIELDS = (
+    Product.id, Product.product_id, Product.price, Product.stock, Product.gender,
+    Product.brand_id, Product.category_id, Product.sizes,
+)
+
+# session.info key collecting flushed product rows until the transaction commits
+_PENDING = "product_columns_pending"
+
+
+class _Columns:
+    """One snapshot of the filterable product columns, ordered by Product.id"""
+
+    def __init__(self, rows, size_names: List[str] = None):
+        size_names = list(size_names or [])
+        for row in rows:
+            for size in row[7] or ():
+                if size not in size_names:
+                    size_names.append(size)
+        self.size_names = size_names
+        self.size_bits = {size: bit for bit, size in enumerate(size_names)}
+        self.words = max(1, math.ceil(len(size_names) / 64))
+
+        n = len(rows)
+        self.ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=n)
+        self.product_ids = np.fromiter((row[1] for row in rows), dtype=np.int64, count=n)
+        self.price = np.fromiter((row[2] for row in rows), dtype=np.int64, count=n)
+        self.stock = np.fromiter((row[3] for row in rows), dtype=np.int64, count=n)
+        self.gender = np.fromiter((_gender_code(row[4]) for row in rows), dtype=np.int8, count=n)
+        self.brand_id = np.fromiter((row[5] for row in rows), dtype=np.int64, count=n)
+        self.category_id = np.fromiter((row[6] for row in rows), dtype=np.int64, count=n)
+        self.live = np.ones(n, dtype=bool)
+
+        masks = [self.size_mask(row[7]) for row in rows]
+        self.sizes = np.zeros((n, self.words), dtype=np.uint64)
+        for word in range(self.words):
+            self.sizes[:, word] = np.fromiter(
+                ((mask >> (64 * word)) & 0xFFFFFFFFFFFFFFFF for mask in masks), dtype=np.uint64, count=n
+            )
+
+    def size_mask(self, sizes) -> int:
+        """Bitmask of the known ``sizes`` as a Python int (bit i = size_names[i])"""
+        mask = 0
+        for size in sizes or ():
+            bit = self.size_bits.get(size)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def size_words(self, sizes) -> np.ndarray:
+        mask = self.size_mask(sizes)
+        return np.array(
+            [(mask >> (64 * word)) & 0xFFFFFFFFFFFFFFFF for word in range(self.words)], dtype=np.uint64
+        )
+
+    def position(self, id: int) -> Optional[int]:
+        position = int(np.searchsorted(self.ids, id))
+        if position < len(self.ids) and self.ids[position] == id:
+            return position
+        return None
+
+
+def _gender_code(gender: Optional[str]) -> int:
+    return GENDERS.index(gender) if gender in GENDERS else -1
+
+
+class ProductColumns:
+    """In-memory columnar copy of the product fields listings filter on.
+
+    Price, stock, gender, brand and category are NumPy arrays and sizes a
+    bitmask per product, so ProductFilters become a handful of vectorized
+    masks. One call returns the page of ids, the total and the facet counts,
+    instead of a filtered query plus a separate ``count()`` per page.
+
+    Kept current by SQLAlchemy events: rows flushed by this process are
+    applied when their transaction commits. A full reload every
+    ``refresh_seconds`` (or after ``invalidate()``) picks up writes from
+    other workers.
+    """
+
+    def __init__(self, refresh_seconds: float, price_buckets: List[int]):
+        self.refresh_seconds = refresh_seconds
+        self.price_buckets = np.asarray(sorted(price_buckets), dtype=np.int64)
+        self._columns = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def columns(self, db: Session) -> _Columns:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds:
+            with self._lock:
+                if self._loaded_at is loaded_at:
+                    self._columns = _Columns(db.query(*FIELDS).order_by(Product.id.asc()).all())
+                    self._loaded_at = time.monotonic()
+        return self._columns
+
+    def apply(self, upserts: List[tuple], deleted_ids: List[int]):
+        """Apply committed product rows (FIELDS order) and deletions by Product.id"""
+        columns = self._columns
+        if columns is None or self._loaded_at is None:
+            return
+
+        with self._lock:
+            if columns is not self._columns:
+                return
+
+            # Last write per product wins; a product deleted in the same transaction stays deleted
+            upserts = {row[0]: row for row in upserts}
+            appended = []
+            for id, row in upserts.items():
+                if any(size not in columns.size_bits for size in row[7] or ()):
+                    # New sizes change the bitmask layout; rebuild on next use
+                    self.invalidate()
+                    return
+
+                position = columns.position(id)
+                if position is None:
+                    appended.append(row)
+                    continue
+
+                columns.price[position] = row[2]
+                columns.stock[position] = row[3]
+                columns.gender[position] = _gender_code(row[4])
+                columns.brand_id[position] = row[5]
+                columns.category_id[position] = row[6]
+                columns.sizes[position] = columns.size_words(row[7])
+                columns.live[position] = True
+
+            if appended:
+                appended.sort()
+                if len(columns.ids) and appended[0][0] < columns.ids[-1]:
+                    self.invalidate()
+                    return
+                columns = _concatenate(columns, _Columns(appended, columns.size_names))
+
+            for id in deleted_ids:
+                position = columns.position(id)
+                if position is not None:
+                    columns.live[position] = False
+            self._columns = columns
+
+    def filter(self, db: Session, brand_id: int = None, filters: ProductFilters = None,
+               offset: int = 0, limit: int = 10) -> Tuple[List[int], int, dict]:
+        """``(product ids of the page, total matches, facet counts)``.
+
+        Each facet counts products matching every filter except its own, so
+        picking one gender still shows how many products the other genders
+        have.
+        """
+        columns = self.columns(db)
+        base = columns.live.copy()
+        if brand_id is not None:
+            base &= columns.brand_id == brand_id
+
+        masks = {}
+        if filters:
+            if filters.gender:
+                masks["gender"] = columns.gender == _gender_code(filters.gender)
+            if filters.category_ids:
+                masks["category"] = np.isin(columns.category_id, filters.category_ids)
+            if filters.min_price is not None or filters.max_price is not None:
+                price = np.ones(len(columns.ids), dtype=bool)
+                if filters.min_price is not None:
+                    price &= columns.price >= filters.min_price
+                if filters.max_price is not None:
+                    price &= columns.price <= filters.max_price
+                masks["price"] = price
+            if filters.sizes:
+                masks["size"] = (columns.sizes & columns.size_words(filters.sizes)).any(axis=1)
+            if filters.in_stock_only:
+                masks["stock"] = columns.stock > 0
+
+        matched = base.copy()
+        for mask in masks.values():
+            matched &= mask
+        positions = np.flatnonzero(matched)
+
+        def facet_mask(name: str) -> np.ndarray:
+            if name not in masks:
+                return matched
+            mask = base.copy()
+            for other, other_mask in masks.items():
+                if other != name:
+                    mask &= other_mask
+            return mask
+
+        facets = {
+            "gender": self._gender_counts(columns, facet_mask("gender")),
+            "category": self._category_counts(columns, facet_mask("category")),
+            "size": self._size_counts(columns, facet_mask("size")),
+            "price": self._price_counts(columns, facet_mask("price")),
+        }
+        page = columns.product_ids[positions[offset:offset + limit]].tolist()
+        return page, len(positions), facets
+
+    @staticmethod
+    def _gender_counts(columns: _Columns, mask: np.ndarray) -> Dict[str, int]:
+        codes = columns.gender[mask]
+        counts = np.bincount(codes[codes >= 0], minlength=len(GENDERS))
+        return {gender: int(count) for gender, count in zip(GENDERS, counts)}
+
+    @staticmethod
+    def _category_counts(columns: _Columns, mask: np.ndarray) -> Dict[int, int]:
+        category_ids, counts = np.unique(columns.category_id[mask], return_counts=True)
+        return {int(category_id): int(count) for category_id, count in zip(category_ids, counts)}
+
+    @staticmethod
+    def _size_counts(columns: _Columns, mask: np.ndarray) -> Dict[str, int]:
+        # Bytes of each little-endian uint64 word, unpacked so bit i lands in column i
+        words = columns.sizes[mask].astype("<u8").view(np.uint8)
+        counts = np.unpackbits(words, axis=1, bitorder="little").sum(axis=0)
+        return {size: int(counts[bit]) for bit, size in enumerate(columns.size_names) if counts[bit]}
+
+    def _price_counts(self, columns: _Columns, mask: np.ndarray) -> Dict[str, int]:
+        buckets = np.searchsorted(self.price_buckets, columns.price[mask], side="right") - 1
+        counts = np.bincount(buckets[buckets >= 0], minlength=len(self.price_buckets))
+        labels = [
+            f"{low}-{high - 1}" for low, high in zip(self.price_buckets[:-1], self.price_buckets[1:])
+        ] + [f"{self.price_buckets[-1]}+"]
+        return dict(zip(labels, counts.tolist()))
+
+
+def _concatenate(columns: _Columns, tail: _Columns) -> _Columns:
+    """``columns`` followed by ``tail`` (built with the same size vocabulary)"""
+    merged = object.__new__(_Columns)
+    merged.size_names, merged.size_bits, merged.words = columns.size_names, columns.size_bits, columns.words
+    for name in ("ids", "product_ids", "price", "stock", "gender", "brand_id", "category_id", "live", "sizes"):
+        setattr(merged, name, np.concatenate([getattr(columns, name), getattr(tail, name)]))
+    return merged
+
+
+product_columns = ProductColumns(settings.PRODUCT_COLUMNS_REFRESH_SECONDS, settings.PRODUCT_FACET_PRICE_BUCKETS)
+
+
+def _row(product: Product) -> tuple:
+    return tuple(getattr(product, field.key) for field in FIELDS)
+
+
+@event.listens_for(Product, "after_insert")
+@event.listens_for(Product, "after_update")
+def _record_upsert(mapper, connection, product):
+    session = Session.object_session(product)
+    if session is not None:
+        session.info.setdefault(_PENDING, ([], []))[0].append(_row(product))
+
+
+@event.listens_for(Product, "after_delete")
+def _record_delete(mapper, connection, product):
+    session = Session.object_session(product)
+    if session is not None:
+        session.info.setdefault(_PENDING, ([], []))[1].append(product.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        product_columns.apply(*pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop(_PENDING, None)
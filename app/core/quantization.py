@@ -0,0 +1,100 @@
+import numpy as np
+
+from app.core.vector_search import top_k_indices
+
+QUANTIZATIONS = ("float16", "int8")
+
+
+class QuantizedMatrix:
+    """Low-precision copy of an embedding matrix for cheap candidate search.
+
+    ``float16`` halves the footprint. ``int8`` stores each dimension as
+    ``round(x / scale[d])`` with a per-dimension scale, a quarter of the
+    float32 size. Queries are scored against the codes in float32 blocks,
+    and the best ``rescore`` candidates are re-ranked against the
+    full-precision (memory-mapped) vectors so the final order is exact.
+    """
+
+    def __init__(self, codes: np.ndarray, scale: np.ndarray = None):
+        self.codes = codes
+        self.scale = scale
+
+    @property
+    def dtype(self) -> str:
+        return self.codes.dtype.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @classmethod
+    def quantize(cls, vectors: np.ndarray, dtype: str = "int8", batch_size: int = 65536) -> "QuantizedMatrix":
+        if dtype not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{dtype}', expected one of {QUANTIZATIONS}")
+
+        if dtype == "float16":
+            return cls(np.asarray(vectors, dtype=np.float16))
+
+        # Per-dimension scale from the absolute maximum, computed block by block
+        max_abs = np.zeros(vectors.shape[1], dtype=np.float32)
+        for start in range(0, len(vectors), batch_size):
+            np.maximum(max_abs, np.abs(vectors[start:start + batch_size]).max(axis=0), out=max_abs)
+        scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for start in range(0, len(vectors), batch_size):
+            block = np.asarray(vectors[start:start + batch_size], dtype=np.float32) / scale
+            codes[start:start + batch_size] = np.clip(np.rint(block), -127, 127)
+        return cls(codes, scale)
+
+    def append(self, vectors: np.ndarray):
+        """Quantize new rows with the existing scale and add them at the end"""
+        if self.scale is None:
+            codes = np.asarray(vectors, dtype=np.float16)
+        else:
+            codes = np.clip(np.rint(np.asarray(vectors, dtype=np.float32) / self.scale), -127, 127).astype(np.int8)
+        self.codes = np.concatenate([self.codes, codes])
+
+    def scores(self, queries: np.ndarray, batch_size: int = 4096) -> np.ndarray:
+        """Approximate (n_queries, n_items) inner products against the codes"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.scale is not None:
+            # q . (codes * scale) == (q * scale) . codes
+            queries = queries * self.scale
+
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        for start in range(0, len(self.codes), batch_size):
+            block = self.codes[start:start + batch_size].astype(np.float32)
+            scores[:, start:start + batch_size] = queries @ block.T
+        return scores
+
+    def search(self, queries: np.ndarray, k: int, full_vectors: np.ndarray = None,
+               rescore: int = 200, exclude: np.ndarray = None):
+        """Top k rows per query, rescoring ``rescore`` candidates exactly.
+
+        Without ``full_vectors`` (or with ``rescore`` <= k) the approximate
+        ranking is returned as is. Returns ``(rows, scores)`` of shape
+        ``(n_queries, k)``, best first.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        scores = self.scores(queries)
+        if exclude is not None:
+            scores[:, exclude] = -np.inf
+
+        if full_vectors is None or rescore <= k:
+            rows = top_k_indices(scores, k)
+            return rows, np.take_along_axis(scores, rows, axis=-1)
+
+        candidates = top_k_indices(scores, rescore)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+
+        exact = np.empty(candidates.shape, dtype=np.float32)
+        for i, (query, rows) in enumerate(zip(queries, candidates)):
+            exact[i] = np.asarray(full_vectors[rows] @ query)
+        exact[~np.isfinite(candidate_scores)] = -np.inf
+
+        best = top_k_indices(exact, k)
+        return np.take_along_axis(candidates, best, axis=-1), np.take_along_axis(exact, best, axis=-1)
@@ -0,0 +1,63 @@
+import threading
+import time
+from typing import Iterable, List
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import Product
+
+
+class ProductIdPool:
+    """In-memory pool of available product ids for random sampling without ``ORDER BY random()``.
+
+    Only published, in-stock products are pooled. The pool is reloaded at
+    most every ``refresh_seconds``, or right away after ``invalidate()``. Samples
+    are drawn by random position, so a draw costs O(n + len(exclude))
+    however large the catalog is.
+    """
+
+    def __init__(self, refresh_seconds: float, seed: int = None):
+        self.refresh_seconds = refresh_seconds
+        self._ids = np.empty(0, dtype=np.int64)
+        self._loaded_at = None
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Reload on next use, e.g. after products are created, deleted or sold out"""
+        self._loaded_at = None
+
+    def ids(self, db: Session) -> np.ndarray:
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds:
+            with self._lock:
+                if self._loaded_at is loaded_at:
+                    product_ids = [
+                        product_id for (product_id,) in db.query(Product.product_id)
+                        .filter(Product.stock > 0, Product.is_published == True)
+                    ]
+                    self._ids = np.asarray(product_ids, dtype=np.int64)
+                    self._loaded_at = time.monotonic()
+        return self._ids
+
+    def sample(self, db: Session, n: int, exclude: Iterable[int] = ()) -> List[int]:
+        """Up to ``n`` distinct random product ids not in ``exclude``"""
+        ids = self.ids(db)
+        exclude = np.fromiter(exclude, dtype=np.int64)
+        if n <= 0 or not len(ids):
+            return []
+
+        # Drawing len(exclude) extra positions guarantees n survivors when enough ids remain
+        size = min(len(ids), n + len(exclude))
+        with self._lock:
+            positions = self._rng.choice(len(ids), size, replace=False)
+
+        candidates = ids[positions]
+        if len(exclude):
+            candidates = candidates[~np.isin(candidates, exclude)]
+        return candidates[:n].tolist()
+
+
+product_id_pool = ProductIdPool(settings.PRODUCT_POOL_REFRESH_SECONDS)
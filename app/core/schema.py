@@ -0,0 +1,37 @@
+"""Columns added by optional migration commands after the tables were created.
+
+The tables are created outside this codebase, so code using a column that a
+command in app.commands adds checks for it here first and falls back to the
+old behaviour until the command has been run.
+"""
+import logging
+import threading
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+_columns = {}
+_lock = threading.Lock()
+
+
+def has_column(db, table: str, column: str) -> bool:
+    """Whether ``table.column`` exists, looked up once per process.
+
+    Uses its own connection, so a missing column never aborts the caller's
+    transaction. Workers pick up a newly added column on restart.
+    """
+    key = (table, column)
+    if key not in _columns:
+        with _lock:
+            if key not in _columns:
+                try:
+                    names = {info["name"] for info in inspect(db.get_bind()).get_columns(table)}
+                except SQLAlchemyError:
+                    logger.exception(f"Could not inspect the columns of {table}")
+                    names = set()
+                _columns[key] = column in names
+                if not _columns[key]:
+                    logger.warning(f"{table}.{column} does not exist yet; features using it are disabled")
+    return _columns[key]
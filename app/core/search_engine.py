@@ -0,0 +1,116 @@
+import asyncio
+import io
+import logging
+import threading
+from typing import List
+
+import httpx
+import numpy as np
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.embeddings import EmbeddingStore, get_embedding_store
+from app.core.encoders import get_encoder
+from app.core.http_client import SearchAPIClient, search_api_client
+
+logger = logging.getLogger(__name__)
+
+SEARCH_ENGINES = ("local", "remote")
+
+
+class LocalSearchEngine:
+    """Encodes queries in process and searches the shared embedding store.
+
+    Text and image queries are both matched against the catalog image
+    embeddings (the encoder maps them into the same space), using the
+    store's configured search mode. Encoding and scoring run in a worker
+    thread so the event loop stays free.
+    """
+
+    def __init__(self, store: EmbeddingStore, top_k: int):
+        self.store = store
+        self.top_k = top_k
+
+    async def search_text(self, text_query: str) -> List[int]:
+        return await asyncio.to_thread(self._search_text, text_query)
+
+    async def search_image(self, content: bytes, filename: str = None, content_type: str = None) -> List[int]:
+        return await asyncio.to_thread(self._search_image, content)
+
+    def _search_text(self, text_query: str) -> List[int]:
+        return self._search(get_encoder().encode_texts([text_query]))
+
+    def _search_image(self, content: bytes) -> List[int]:
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(content)).convert("RGB")
+        return self._search(get_encoder().encode_images([image]))
+
+    def _search(self, queries: np.ndarray) -> List[int]:
+        rows, _ = self.store.search_images(queries, self.top_k)
+        return rows[0][rows[0] >= 0].tolist()
+
+
+class RemoteSearchEngine:
+    """Forwards queries to the external search service at SEARCH_API_URL.
+
+    The service answers with ranked image paths, which are mapped back to
+    embedding rows so both engines feed the same hydration path.
+    """
+
+    def __init__(self, store: EmbeddingStore, client: SearchAPIClient):
+        self.store = store
+        self.client = client
+
+    async def search_text(self, text_query: str) -> List[int]:
+        return self._rows(await self._post(data={'text_query': text_query}))
+
+    async def search_image(self, content: bytes, filename: str = None, content_type: str = None) -> List[int]:
+        return self._rows(await self._post(files={'image': (filename, content, content_type)}))
+
+    async def _post(self, **kwargs) -> httpx.Response:
+        try:
+            return await self.client.post("/search", **kwargs)
+        except httpx.TimeoutException:
+            raise HTTPException(
+                status_code=504,
+                detail="External search API timed out"
+            )
+        except httpx.HTTPError:
+            raise HTTPException(
+                status_code=502,
+                detail="External search API unreachable"
+            )
+
+    def _rows(self, response: httpx.Response) -> List[int]:
+        logger.debug(f"External API response status: {response.status_code}")
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="External search API error"
+            )
+
+        product_paths = response.json().get('paths', [])
+        rows = [self.store.row_for_thumbnail(path) for path in product_paths]
+        return [row for row in rows if row is not None]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_search_engine():
+    """The engine selected by SEARCH_ENGINE, created once per process"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if settings.SEARCH_ENGINE == "local":
+                    _engine = LocalSearchEngine(get_embedding_store(), settings.SEARCH_TOP_K)
+                elif settings.SEARCH_ENGINE == "remote":
+                    _engine = RemoteSearchEngine(get_embedding_store(), search_api_client)
+                else:
+                    raise ValueError(
+                        f"Unknown search engine '{settings.SEARCH_ENGINE}', expected one of {SEARCH_ENGINES}"
+                    )
+    return _engine
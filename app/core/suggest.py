@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import List
+
+import numpy as np
+
+from app.core.cache import normalize_query
+from app.core.config import settings
+from app.core.vector_search import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+SUGGESTION_TYPES = ("product", "brand", "category")
+
+
+class _Suffixes:
+    """Sorted word-start suffixes, cut to ``length`` characters, as a sequence for bisect"""
+
+    def __init__(self, index: "PrefixIndex", length: int):
+        self.keys = index._keys
+        self.entries = index._suffix_entries
+        self.offsets = index._suffix_offsets
+        self.length = length
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, position: int) -> str:
+        offset = int(self.offsets[position])
+        return self.keys[self.entries[position]][offset:offset + self.length]
+
+
+class PrefixIndex:
+    """Immutable prefix index ranking texts by popularity.
+
+    Stands in for a trie at a fraction of its memory: every word-start
+    suffix of each normalized text ("red summer dress", "summer dress",
+    "dress") is one (entry, offset) pair in two int32 arrays sorted by the
+    suffix, so a prefix maps to one contiguous range found by binary search
+    and "dre" matches "Red Summer Dress". The range's entries are ranked by
+    popularity with argpartition; short prefixes, whose ranges are largest,
+    are memoized.
+    """
+
+    def __init__(self, texts: List[str], popularity, max_words: int = 8, memo_length: int = 2):
+        self.texts = list(texts)
+        self._keys = [normalize_query(text) for text in self.texts]
+        self.memo_length = memo_length
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+        # Shorter texts win ties so "dress" comes before "dress shirt"
+        lengths = np.fromiter((len(key) for key in self._keys), dtype=np.float64, count=len(self._keys))
+        self._scores = np.asarray(popularity, dtype=np.float64) + 1.0 / (2.0 + lengths)
+
+        entries, offsets = [], []
+        for entry, key in enumerate(self._keys):
+            starts = [0] + [i + 1 for i, char in enumerate(key) if char == " "][:max_words - 1]
+            entries.extend([entry] * len(starts))
+            offsets.extend(starts)
+
+        order = sorted(range(len(entries)), key=lambda i: self._keys[entries[i]][offsets[i]:])
+        self._suffix_entries = np.asarray(entries, dtype=np.int32)[order]
+        self._suffix_offsets = np.asarray(offsets, dtype=np.int32)[order]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held: strings, list slots and arrays"""
+        strings = sum(sys.getsizeof(text) for text in self.texts)
+        strings += sum(sys.getsizeof(key) for key in self._keys)
+        slots = 8 * (len(self.texts) + len(self._keys))
+        arrays = self._scores.nbytes + self._suffix_entries.nbytes + self._suffix_offsets.nbytes
+        return strings + slots + arrays
+
+    def lookup(self, prefix: str, k: int) -> List[int]:
+        """Entries with a word starting with ``prefix``, most popular first"""
+        prefix = normalize_query(prefix)
+        if not prefix or k <= 0:
+            return []
+
+        if len(prefix) <= self.memo_length:
+            fetched, best = self._memo.get(prefix, (0, None))
+            if fetched < k:
+                fetched = max(k, 10)
+                best = self._lookup(prefix, fetched)
+                with self._memo_lock:
+                    self._memo[prefix] = (fetched, best)
+            return best[:k]
+
+        return self._lookup(prefix, k)
+
+    def _lookup(self, prefix: str, k: int) -> List[int]:
+        suffixes = _Suffixes(self, len(prefix))
+        start = bisect_left(suffixes, prefix)
+        end = bisect_right(suffixes, prefix, lo=start)
+        if start == end:
+            return []
+
+        entries = self._suffix_entries[start:end]
+        # An entry appears once per matching word; over-fetch so duplicates rarely leave the page short
+        best = entries[top_k_indices(self._scores[entries], 2 * k)]
+        best = list(dict.fromkeys(best.tolist()))
+        if len(best) < k and len(best) < len(entries):
+            unique = np.unique(entries)
+            best = unique[top_k_indices(self._scores[unique], k)].tolist()
+        return best[:k]
+
+
+class SuggestionIndex:
+    """Process-wide autocomplete over product titles, brand and category names.
+
+    Products are ranked by likes plus units ordered; brands and categories
+    by the popularity of their products plus their product count, so busy
+    brands outrank obscure ones. Built on first use and rebuilt in the
+    background when a product, brand or category change marked it stale
+    (checked every ``check_seconds``) and every ``refresh_seconds`` to pick
+    up other workers' edits and popularity drift.
+    """
+
+    def __init__(self, check_seconds: float, refresh_seconds: float):
+        self.check_seconds = check_seconds
+        self.refresh_seconds = refresh_seconds
+        # (PrefixIndex, type per entry, id per entry), swapped as one reference
+        self._state = None
+        self._built_at = None
+        self._stale = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entries(db):
+        from sqlalchemy import func
+
+        from app.models.models import Brand, Category, OrderItem, Product, ProductFeedback
+
+        likes = dict(
+            db.query(ProductFeedback.product_id, func.count())
+            .filter(ProductFeedback.liked == True)
+            .group_by(ProductFeedback.product_id)
+        )
+        ordered = dict(
+            db.query(OrderItem.product_id, func.sum(OrderItem.quantity)).group_by(OrderItem.product_id)
+        )
+
+        # One suggestion per distinct text and type, carrying its most popular id
+        best = {}
+        brand_popularity, category_popularity = {}, {}
+
+        def add(kind, id, text, popularity):
+            key = (kind, normalize_query(text or ""))
+            if key[1] and (key not in best or popularity > best[key][3]):
+                best[key] = (kind, id, text, popularity)
+
+        products = db.query(Product.product_id, Product.title, Product.brand_id, Product.category_id).filter(
+            Product.is_published == True
+        )
+        for product_id, title, brand_id, category_id in products:
+            popularity = likes.get(product_id, 0) + (ordered.get(product_id) or 0)
+            add("product", product_id, title, popularity)
+            brand_popularity[brand_id] = brand_popularity.get(brand_id, 0) + popularity + 1
+            category_popularity[category_id] = category_popularity.get(category_id, 0) + popularity + 1
+
+        for id, name in db.query(Brand.id, Brand.name).filter(Brand.is_active == True):
+            add("brand", id, name, brand_popularity.get(id, 0))
+        for id, name in db.query(Category.id, Category.name):
+            add("category", id, name, category_popularity.get(id, 0))
+        return list(best.values())
+
+    def build(self, db) -> PrefixIndex:
+        started = time.perf_counter()
+        entries = self._entries(db)
+        index = PrefixIndex([text for _, _, text, _ in entries], [popularity for *_, popularity in entries])
+        types = np.asarray([SUGGESTION_TYPES.index(kind) for kind, *_ in entries], dtype=np.int8)
+        ids = np.asarray([id for _, id, *_ in entries], dtype=np.int64)
+
+        self._state = (index, types, ids)
+        self._built_at = time.monotonic()
+        logger.info(
+            f"Built suggestion index over {len(index)} texts in {time.perf_counter() - started:.2f}s "
+            f"({index.nbytes / 2**20:.1f} MB)"
+        )
+        return index
+
+    def suggest(self, db, prefix: str, limit: int = 10) -> List[dict]:
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    self.build(db)
+
+        index, types, ids = self._state
+        return [
+            {"text": index.texts[entry], "type": SUGGESTION_TYPES[types[entry]], "id": int(ids[entry])}
+            for entry in index.lookup(prefix, limit)
+        ]
+
+    def mark_stale(self):
+        """Rebuild at the next check; called after catalog writes in this worker"""
+        self._stale = True
+
+    async def run_refresh(self):
+        """Rebuild when stale or too old until cancelled"""
+        from app.db.database import SessionLocal
+
+        def rebuild():
+            self._stale = False
+            with SessionLocal() as db:
+                self.build(db)
+
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            if self._state is None:
+                continue
+            if not self._stale and time.monotonic() - self._built_at < self.refresh_seconds:
+                continue
+            try:
+                await asyncio.to_thread(rebuild)
+            except Exception:
+                self._stale = True
+                logger.exception("Suggestion index rebuild failed")
+
+
+suggestion_index = SuggestionIndex(settings.SUGGEST_CHECK_SECONDS, settings.SUGGEST_REFRESH_SECONDS)
@@ -0,0 +1,73 @@
+"""Ranked Postgres text search over products, brands, categories and users.
+
+Each searchable table gets a generated ``search_vector`` tsvector column
+(weighted, so name/title matches outrank descriptions) with a GIN index,
+and a pg_trgm GIN index on its name column so substring and misspelled
+queries stay indexable. ``python -m app.commands.create_search_indexes``
+applies the migration; select the mode with TEXT_SEARCH_MODE=postgres.
+"""
+from typing import List
+
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+
+TEXT_SEARCH_MODES = ("like", "postgres")
+
+# Postgres text search configuration used for both indexing and queries
+TS_CONFIG = "english"
+
+# table -> ((column, tsvector weight), ...), trigram-indexed name column
+SEARCH_COLUMNS = {
+    "products": ((("title", "A"), ("description", "B")), "title"),
+    "brands": ((("name", "A"), ("description", "B")), "name"),
+    "categories": ((("name", "A"),), "name"),
+    "users": ((("username", "A"), ("full_name", "B")), "username"),
+}
+
+
+def migration(tables: List[str] = None) -> List[str]:
+    """Idempotent DDL adding the search columns and indexes"""
+    statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+    for table in tables or SEARCH_COLUMNS:
+        weighted, trigram_column = SEARCH_COLUMNS[table]
+        vector = " || ".join(
+            f"setweight(to_tsvector('{TS_CONFIG}', coalesce({column}, '')), '{weight}')"
+            for column, weight in weighted
+        )
+        statements += [
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({vector}) STORED",
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)",
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{trigram_column}_trgm "
+            f"ON {table} USING GIN ({trigram_column} gin_trgm_ops)",
+        ]
+    return statements
+
+
+def enabled() -> bool:
+    if settings.TEXT_SEARCH_MODE not in TEXT_SEARCH_MODES:
+        raise ValueError(
+            f"Unknown text search mode '{settings.TEXT_SEARCH_MODE}', expected one of {TEXT_SEARCH_MODES}"
+        )
+    return settings.TEXT_SEARCH_MODE == "postgres"
+
+
+def ranked(query: Query, model, search: str) -> Query:
+    """``query`` narrowed to rows matching ``search`` and ordered best first.
+
+    Rows match on full-text terms (stemmed, any word order) or on a
+    case-insensitive substring of the name column; the rank adds the
+    full-text cover density to the trigram similarity of the name.
+    """
+    table = model.__tablename__
+    _, trigram_column = SEARCH_COLUMNS[table]
+    name = getattr(model, trigram_column)
+    vector = literal_column(f"{table}.search_vector")
+    tsquery = func.websearch_to_tsquery(TS_CONFIG, search)
+
+    rank = func.ts_rank_cd(vector, tsquery) + func.similarity(name, search)
+    return query.filter(
+        or_(vector.op("@@")(tsquery), name.icontains(search, autoescape=True))
+    ).order_by(rank.desc(), model.id.asc())
@@ -0,0 +1,219 @@
+import numpy as np
+
+AGGREGATIONS = ("max", "mean", "rrf")
+
+# Damping constant from the reciprocal-rank fusion paper (Cormack et al.)
+RRF_K = 60
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores along the last axis, best first.
+
+    Uses argpartition so only the k winners are sorted, which keeps the cost
+    at O(n + k log k) per row instead of a full O(n log n) argsort.
+    """
+    n_items = scores.shape[-1]
+    k = min(k, n_items)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    if k < n_items:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_items), scores.shape).copy()
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+def aggregate_scores(scores: np.ndarray, k: int, method: str = "max") -> np.ndarray:
+    """Collapse an (n_seeds, n_items) score matrix into one score per item.
+
+    ``max`` keeps each item's best seed similarity, ``mean`` averages over
+    seeds and ``rrf`` sums reciprocal ranks of each seed's top k items.
+    Items scored ``-inf`` by every seed stay at ``-inf``.
+    """
+    if method == "max":
+        return scores.max(axis=0)
+
+    if method == "mean":
+        return scores.mean(axis=0)
+
+    if method == "rrf":
+        top = top_k_indices(scores, k)
+        top_scores = np.take_along_axis(scores, top, axis=-1)
+        ranks = np.broadcast_to(np.arange(1, top.shape[-1] + 1), top.shape)
+        weights = np.where(np.isfinite(top_scores), 1.0 / (RRF_K + ranks), 0.0)
+
+        fused = np.zeros(scores.shape[-1], dtype=np.float32)
+        np.add.at(fused, top.ravel(), weights.ravel())
+        fused[~np.isfinite(scores).any(axis=0)] = -np.inf
+        return fused
+
+    raise ValueError(f"Unknown aggregation '{method}', expected one of {AGGREGATIONS}")
+
+
+def top_k_aggregated(scores: np.ndarray, k: int, method: str = "max",
+                     exclude=None):
+    """Top k items over all seeds of an (n_seeds, n_items) score matrix.
+
+    ``exclude`` (row indices or a boolean mask over items) is applied to
+    ``scores`` in place before ranking. Returns ``(rows, scores)`` best first,
+    deduplicated across seeds and without excluded items.
+    """
+    if exclude is not None:
+        scores[:, exclude] = -np.inf
+
+    aggregated = aggregate_scores(scores, k, method)
+    rows = top_k_indices(aggregated, k)
+    row_scores = aggregated[rows]
+
+    keep = np.isfinite(row_scores)
+    return rows[keep], row_scores[keep]
+
+
+class SegmentedMatrix:
+    """Rows of several matrices viewed as one, without copying them.
+
+    Lets a large memory-mapped base segment and a small in-memory delta
+    segment be scored and indexed as a single embedding matrix.
+    """
+
+    def __init__(self, segments):
+        self.segments = list(segments)
+        self.offsets = np.cumsum([0] + [len(segment) for segment in self.segments])
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def shape(self):
+        return (len(self), self.segments[0].shape[1])
+
+    def __getitem__(self, rows):
+        if np.isscalar(rows):
+            segment = np.searchsorted(self.offsets, rows, side="right") - 1
+            return np.asarray(self.segments[segment][rows - self.offsets[segment]])
+
+        rows = np.asarray(rows, dtype=np.int64)
+        gathered = np.empty(rows.shape + (self.shape[1],), dtype=np.float32)
+        segment_ids = np.searchsorted(self.offsets, rows, side="right") - 1
+        for segment_id, segment in enumerate(self.segments):
+            in_segment = segment_ids == segment_id
+            if in_segment.any():
+                gathered[in_segment] = segment[rows[in_segment] - self.offsets[segment_id]]
+        return gathered
+
+
+def inner_products(vectors, queries: np.ndarray) -> np.ndarray:
+    """(n_queries, n_items) inner products against a matrix or SegmentedMatrix"""
+    queries = np.atleast_2d(queries)
+    if isinstance(vectors, SegmentedMatrix):
+        return np.hstack([np.asarray(queries @ segment.T) for segment in vectors.segments])
+    return np.asarray(queries @ vectors.T)
+
+
+def blended_scores(image_vectors: np.ndarray, image_queries: np.ndarray,
+                   text_vectors: np.ndarray = None, text_queries: np.ndarray = None,
+                   text_weight: float = 0.0) -> np.ndarray:
+    """(n_queries, n_items) cosine scores blending image and text similarity.
+
+    ``(1 - text_weight) * image + text_weight * text``, accumulated in place
+    on the image score matrix so only one extra score buffer is allocated.
+    """
+    scores = inner_products(image_vectors, image_queries)
+    if not text_weight:
+        return scores
+
+    scores *= 1.0 - text_weight
+    text_scores = inner_products(text_vectors, text_queries)
+    text_scores *= text_weight
+    scores += text_scores
+    return scores
+
+
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int, exclude=None):
+    """Brute-force top k rows of ``vectors`` for each query by inner product.
+
+    Returns ``(rows, scores)`` of shape ``(n_queries, k)``, best first.
+    """
+    scores = inner_products(vectors, queries)
+    if exclude is not None:
+        scores[:, exclude] = -np.inf
+
+    rows = top_k_indices(scores, k)
+    return rows, np.take_along_axis(scores, rows, axis=-1)
+
+
+def aggregate_candidates(rows: np.ndarray, scores: np.ndarray, k: int, method: str = "max"):
+    """Top k items from per-seed candidate lists of shape (n_seeds, depth).
+
+    The sparse counterpart of ``top_k_aggregated`` for candidates coming from
+    an approximate index, where only each seed's best rows are known. Rows of
+    -1 (padding) are ignored. For ``mean`` a seed that did not return an item
+    contributes zero similarity to it.
+    """
+    if method not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{method}', expected one of {AGGREGATIONS}")
+
+    valid = (rows >= 0) & np.isfinite(scores)
+    if method == "rrf":
+        ranks = np.broadcast_to(np.arange(1, rows.shape[-1] + 1), rows.shape)
+        values = (1.0 / (RRF_K + ranks))[valid]
+    else:
+        values = scores[valid]
+
+    unique_rows, inverse = np.unique(rows[valid], return_inverse=True)
+    if method == "max":
+        aggregated = np.full(len(unique_rows), -np.inf, dtype=np.float32)
+        np.maximum.at(aggregated, inverse, values)
+    else:
+        aggregated = np.zeros(len(unique_rows), dtype=np.float32)
+        np.add.at(aggregated, inverse, values)
+        if method == "mean":
+            aggregated /= len(rows)
+
+    best = top_k_indices(aggregated, k)
+    return unique_rows[best], aggregated[best]
+
+
+def rescore_candidates(vectors, queries: np.ndarray, rows: np.ndarray, k: int, method: str = "max"):
+    """Top k of the union of per-seed candidate lists, aggregated from exact scores.
+
+    Scores every candidate against every seed, so each seed's own top k is
+    intact for ``max`` and ``rrf`` and ``mean`` averages real similarities
+    instead of treating rows a seed did not return as zero. Rows of -1 are
+    ignored. Returns ``(rows, scores)`` best first.
+    """
+    candidates = np.unique(rows[rows >= 0])
+    if not len(candidates):
+        return candidates, np.empty(0, dtype=np.float32)
+
+    scores = inner_products(vectors[candidates], queries)
+    best, best_scores = top_k_aggregated(scores, k, method)
+    return candidates[best], best_scores
+
+
+def merge_results(rows: np.ndarray, scores: np.ndarray, k: int):
+    """Best k of several ``(rows, scores)`` result sets concatenated along the last axis"""
+    best = top_k_indices(scores, k)
+    return np.take_along_axis(rows, best, axis=-1), np.take_along_axis(scores, best, axis=-1)
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k: int = RRF_K, limit: int = None) -> list:
+    """Fuse ranked id lists from different retrievers into one ranking.
+
+    Each id scores ``weight / (k + rank)`` summed over the lists it appears
+    in (a repeat within one list counts once), so ids ranked well by
+    several retrievers rise to the top without comparing their raw scores.
+    Ties keep the order in which ids were first seen.
+    """
+    weights = [1.0] * len(rankings) if weights is None else weights
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(dict.fromkeys(ranking), 1):
+            fused[item] = fused.get(item, 0.0) + weight / (k + rank)
+
+    ordered = sorted(fused, key=fused.get, reverse=True)
+    return ordered if limit is None else ordered[:limit]
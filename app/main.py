@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from app.routers import products, categories, brands, carts, users, auth, accounts
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
@@ -8,14 +10,46 @@ from app.routers import wishlists
 from app.routers import feedback
 from app.routers import orders
 from app.routers import search
+from app.core.embeddings import embedding_store
+from app.core.indexer import embedding_indexer
+from app.core.decks import swipe_decks
+from app.core.http_client import search_api_client
+from app.core.keyword_index import keyword_index
+from app.core.suggest import suggestion_index
+from app.db.database import SessionLocal
 
 # Initialize Cloudinary
 # initialize_cloudinary()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Map the recommendation embeddings once per worker at startup
+    embedding_store.load()
+    with SessionLocal() as db:
+        embedding_store.sync_product_ids(db)
+
+    # Pick up products other workers appended and compact the delta in the background
+    maintenance = asyncio.create_task(
+        embedding_indexer.run_maintenance(settings.EMBEDDINGS_MAINTENANCE_INTERVAL)
+    )
+    # Rebuild the keyword index periodically so products edited by other workers show up
+    keyword_refresh = asyncio.create_task(keyword_index.run_refresh())
+    suggest_refresh = asyncio.create_task(suggestion_index.run_refresh())
+    if settings.SEARCH_ENGINE == "remote":
+        await search_api_client.start()
+    yield
+    await search_api_client.close()
+    maintenance.cancel()
+    keyword_refresh.cancel()
+    suggest_refresh.cancel()
+    embedding_indexer.shutdown()
+    swipe_decks.shutdown()
+
 
 app = FastAPI(
     title="App API",
+    lifespan=lifespan,
     swagger_ui_parameters={
         "syntaxHighlight.theme": "monokai",
         "layout": "BaseLayout",
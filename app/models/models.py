@@ -1,7 +1,7 @@
 from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, Float, ARRAY, Enum
 from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.db.database import Base
 
 
@@ -118,6 +118,11 @@ class Product(Base):
     is_published = Column(Boolean, server_default="True", nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), nullable=False)
 
+    # Row of this product in the image/text embedding matrices. Added to existing
+    # databases by `python -m app.commands.sync_embedding_rows`; deferred so loading
+    # products never selects it and keeps working before that migration has run
+    embedding_row = deferred(Column(Integer, nullable=True, unique=True, index=True))
+
 
     # New fields
     gender = Column(Enum("men", "women", "unisex", name="gender_types"), nullable=False)
@@ -159,6 +164,9 @@ class ProductFeedback(Base):
     liked = Column(Boolean, nullable=False)
     rating = Column(Float, nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), nullable=False)
+    # Last edit of liked/rating; added by app.commands.add_feedback_updated_at and
+    # only written once it exists (see app.core.schema.has_column)
+    updated_at = deferred(Column(TIMESTAMP(timezone=True), nullable=True))
 
     # Relationships
     user = relationship("User", back_populates="product_feedback")
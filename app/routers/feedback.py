@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, status
-from app.core.security import get_current_user
+from fastapi import APIRouter, Depends, Query, status
+from typing import Optional
+from app.core.security import get_current_user, check_admin_role
+from app.core.cache import recommendation_cache
 from app.db.database import get_db
 from app.services.feedback import FeedbackService
 from sqlalchemy.orm import Session
@@ -11,14 +13,19 @@ from app.services.recommendation import RecommendationService
 
 router = APIRouter(tags=["Feedback"], prefix="/feedback")
 auth_scheme = HTTPBearer()
+optional_auth_scheme = HTTPBearer(auto_error=False)
 
 @router.get("/swipe", response_model=ProductsOut)
 def get_products_for_swiping(
     db: Session = Depends(get_db),
-    limit: int = 10
+    limit: int = Query(10, ge=1, le=100, description="Cards per request"),
+    token: Optional[HTTPAuthorizationCredentials] = Depends(optional_auth_scheme)
 ):
-    products = FeedbackService.get_random_products(db, limit)
-    print(products)
+    # Signed-in users get their own deck without products they already rated
+    if token:
+        products = FeedbackService.get_swipe_deck(db, get_current_user(token), limit)
+    else:
+        products = FeedbackService.get_random_products(db, limit)
     return {"message": f"Random {limit} products for swiping", "data": products}
 
 @router.post("/", response_model=FeedbackOut)
@@ -34,13 +41,28 @@ def submit_feedback(
 @router.get("/recommendations", response_model=dict)
 def get_recommendations(
     db: Session = Depends(get_db),
-    token: HTTPAuthorizationCredentials = Depends(auth_scheme)
+    token: HTTPAuthorizationCredentials = Depends(auth_scheme),
+    aggregation: Optional[str] = Query(None, pattern="^(max|mean|rrf)$", description="How scores from several liked products are combined"),
+    text_weight: Optional[float] = Query(None, ge=0, le=1, description="Weight of description similarity against image similarity"),
+    diversity: Optional[float] = Query(None, ge=0, le=1, description="MMR lambda: 1 ranks by relevance only, lower values favour variety")
 ):
     user_id = get_current_user(token)
     recommendation_service = RecommendationService(db)
-    result = recommendation_service.get_recommendations(user_id)
+    result = recommendation_service.get_recommendations(
+        user_id, aggregation=aggregation, text_weight=text_weight, diversity=diversity
+    )
 
     return {
         "message": "Recommendations based on your activity",
         "data": result
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/recommendations/cache", response_model=dict, dependencies=[Depends(check_admin_role)])
+def get_recommendation_cache_stats(
+    token: HTTPAuthorizationCredentials = Depends(auth_scheme)
+):
+    return {
+        "message": "Recommendation cache statistics",
+        "data": recommendation_cache.stats()
+    }
@@ -18,7 +18,7 @@ def get_all_products(
     db: Session = Depends(get_db),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(10, ge=1, le=100, description="Items per page"),
-    search: str | None = Query("", description="Search based title of products"),
+    search: str | None = Query("", description="Keywords matched against product titles and descriptions"),
 ):
     return ProductService.get_all_products(db, page, limit, search)
 
@@ -30,6 +30,16 @@ def get_product(product_id: int, db: Session = Depends(get_db)):
     return ProductService.get_product(db, product_id)
 
 
+# Get Products Visually Similar To A Product
+@router.get("/{product_id}/similar", status_code=status.HTTP_200_OK, response_model=ProductsOut)
+def get_similar_products(
+    product_id: int,
+    db: Session = Depends(get_db),
+    limit: int = Query(10, ge=1, le=100, description="Number of similar products"),
+):
+    return ProductService.get_similar_products(db, product_id, limit)
+
+
 # Create New Product
 # @router.post(
 #     "/",
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Form
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Form, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.db.database import get_db
 from app.services.search import SearchService
 from app.schemas.search import SearchResponse
+from app.core.security import check_admin_role
+from app.core.http_client import search_api_client
+from app.core.cache import search_cache
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 router = APIRouter(tags=["Search"], prefix="/search")
+auth_scheme = HTTPBearer()
 
 # @router.post("/", response_model=SearchResponse)
 # async def search_products(
@@ -24,6 +29,7 @@ router = APIRouter(tags=["Search"], prefix="/search")
 @router.post("/text", response_model=SearchResponse)
 async def search_products_by_text(
     text_query: str = Form(...),
+    diversity: Optional[float] = Form(None, ge=0, le=1, description="MMR lambda: 1 ranks by relevance only, lower values favour variety"),
     db: Session = Depends(get_db)
 ):
     if not text_query:
@@ -31,11 +37,24 @@ async def search_products_by_text(
             status_code=400,
             detail="Text query must not be empty"
         )
-    return await SearchService.search_products_by_text(db, text_query)
+    return await SearchService.search_products_by_text(db, text_query, diversity)
+
+@router.post("/hybrid", response_model=SearchResponse)
+async def search_products_hybrid(
+    text_query: str = Form(...),
+    db: Session = Depends(get_db)
+):
+    if not text_query:
+        raise HTTPException(
+            status_code=400,
+            detail="Text query must not be empty"
+        )
+    return await SearchService.search_products_hybrid(db, text_query)
 
 @router.post("/image", response_model=SearchResponse)
 async def search_products_by_image(
     image: UploadFile = File(...),
+    diversity: Optional[float] = Form(None, ge=0, le=1, description="MMR lambda: 1 ranks by relevance only, lower values favour variety"),
     db: Session = Depends(get_db)
 ):
     if not image:
@@ -43,4 +62,26 @@ async def search_products_by_image(
             status_code=400,
             detail="Image file must be provided"
         )
-    return await SearchService.search_products_by_image(db, image)
\ No newline at end of file
+    return await SearchService.search_products_by_image(db, image, diversity)
+
+
+@router.get("/suggest", response_model=SearchResponse)
+def suggest(
+    q: str = Query(..., min_length=1, description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum suggestions"),
+    db: Session = Depends(get_db)
+):
+    return SearchService.suggest(db, q, limit)
+
+
+@router.get("/stats", response_model=dict, dependencies=[Depends(check_admin_role)])
+def get_search_stats(
+    token: HTTPAuthorizationCredentials = Depends(auth_scheme)
+):
+    return {
+        "message": "Search cache and external search API connection pool statistics",
+        "data": {
+            "cache": search_cache.stats(),
+            "api_client": search_api_client.stats(),
+        }
+    }
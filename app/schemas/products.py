@@ -234,6 +234,7 @@ class ProductOut(BaseModel):
 class ProductsOut(BaseModel):
     message: str
     data: List[ProductBase]  
+    total: Optional[int] = None
 
     class Config(BaseConfig):
         pass
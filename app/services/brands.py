@@ -9,6 +9,10 @@ from app.services.products import ProductService
 from app.schemas.filters import ProductFilters
 from sqlalchemy import and_
 from app.services.feedback import FeedbackService
+from app.core import text_search
+from app.core.suggest import suggestion_index
+from app.core.product_columns import product_columns
+from app.core.hydration import LISTING_COLUMNS, hydrate_products
 
 
 class BrandService:
@@ -28,8 +32,11 @@ class BrandService:
 
     @staticmethod
     def get_all_brands(db: Session, page: int, limit: int, search: str = ""):
-        brands = db.query(Brand).order_by(Brand.id.asc()).filter(
-            Brand.name.contains(search)).limit(limit).offset((page - 1) * limit).all()
+        if search and text_search.enabled():
+            query = text_search.ranked(db.query(Brand), Brand, search)
+        else:
+            query = db.query(Brand).order_by(Brand.id.asc()).filter(Brand.name.contains(search))
+        brands = query.limit(limit).offset((page - 1) * limit).all()
         
         # Transform full image URLs
         transformed_brands = [
@@ -60,7 +67,7 @@ class BrandService:
         db.add(db_brand)
         db.commit()
         db.refresh(db_brand)
-        
+        suggestion_index.mark_stale()
 
         transformed_brand = BrandService._prepare_brand_response(db_brand)
         return ResponseHandler.create_success(db_brand.name, db_brand.id, transformed_brand)
@@ -80,7 +87,7 @@ class BrandService:
 
         db.commit()
         db.refresh(db_brand)
-        
+        suggestion_index.mark_stale()
 
         transformed_brand = BrandService._prepare_brand_response(db_brand)
         return ResponseHandler.update_success(db_brand.name, db_brand.id, transformed_brand)
@@ -92,6 +99,7 @@ class BrandService:
             ResponseHandler.not_found_error("Brand", brand_id)
         db.delete(db_brand)
         db.commit()
+        suggestion_index.mark_stale()
         return ResponseHandler.delete_success(db_brand.name, db_brand.id, db_brand)
 
     # Old get_brand_products function 
@@ -196,33 +204,41 @@ class BrandService:
         if include_popular:
             popular_products = FeedbackService.get_popular_products(db, brand_id)
 
-        query = db.query(Product).filter(Product.brand_id == brand_id)
+        facets = None
+        if settings.PRODUCT_FILTER_MODE == "columns":
+            # Page, total and facets from the in-memory columns; one query hydrates the page
+            product_ids, total_items, facets = product_columns.filter(
+                db, brand_id, filters, (page - 1) * limit, limit
+            )
+            products, _ = hydrate_products(db, product_ids, LISTING_COLUMNS)
+        else:
+            query = db.query(Product).filter(Product.brand_id == brand_id)
 
-        if filters:
-            if filters.gender:
-                query = query.filter(Product.gender == filters.gender)
-            
-            if filters.category_ids:
-                query = query.filter(Product.category_id.in_(filters.category_ids))
-            
-            if filters.min_price is not None:
-                query = query.filter(Product.price >= filters.min_price)
-            
-            if filters.max_price is not None:
-                query = query.filter(Product.price <= filters.max_price)
-            
-            if filters.sizes:
-                query = query.filter(Product.sizes.overlap(filters.sizes))
-            
-            if filters.in_stock_only:
-                query = query.filter(Product.stock > 0)
+            if filters:
+                if filters.gender:
+                    query = query.filter(Product.gender == filters.gender)
+                
+                if filters.category_ids:
+                    query = query.filter(Product.category_id.in_(filters.category_ids))
+                
+                if filters.min_price is not None:
+                    query = query.filter(Product.price >= filters.min_price)
+                
+                if filters.max_price is not None:
+                    query = query.filter(Product.price <= filters.max_price)
+                
+                if filters.sizes:
+                    query = query.filter(Product.sizes.overlap(filters.sizes))
+                
+                if filters.in_stock_only:
+                    query = query.filter(Product.stock > 0)
 
-        # Apply pagination
-        total_items = query.count()
-        products = query.order_by(Product.id.asc())\
-                    .offset((page - 1) * limit)\
-                    .limit(limit)\
-                    .all()
+            # Apply pagination
+            total_items = query.count()
+            products = query.order_by(Product.id.asc())\
+                        .offset((page - 1) * limit)\
+                        .limit(limit)\
+                        .all()
 
         transformed_products = []
         
@@ -249,6 +265,7 @@ class BrandService:
                 "page": page,
                 "limit": limit,
                 "total_pages": (total_items + limit - 1) // limit,
-                "filters_applied": filters.model_dump() if filters else None
+                "filters_applied": filters.model_dump() if filters else None,
+                "facets": facets
             }
         }
\ No newline at end of file
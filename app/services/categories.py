@@ -2,13 +2,18 @@ from sqlalchemy.orm import Session
 from app.models.models import Category
 from app.schemas.categories import CategoryCreate, CategoryUpdate
 from app.utils.responses import ResponseHandler
+from app.core import text_search
+from app.core.suggest import suggestion_index
 
 
 class CategoryService:
     @staticmethod
     def get_all_categories(db: Session, page: int, limit: int, search: str = ""):
-        categories = db.query(Category).order_by(Category.id.asc()).filter(
-            Category.name.contains(search)).limit(limit).offset((page - 1) * limit).all()
+        if search and text_search.enabled():
+            query = text_search.ranked(db.query(Category), Category, search)
+        else:
+            query = db.query(Category).order_by(Category.id.asc()).filter(Category.name.contains(search))
+        categories = query.limit(limit).offset((page - 1) * limit).all()
         return {"message": f"Page {page} with {limit} categories", "data": categories}
 
     @staticmethod
@@ -25,6 +30,7 @@ class CategoryService:
         db.add(db_category)
         db.commit()
         db.refresh(db_category)
+        suggestion_index.mark_stale()
         return ResponseHandler.create_success(db_category.name, db_category.id, db_category)
 
     @staticmethod
@@ -38,6 +44,7 @@ class CategoryService:
 
         db.commit()
         db.refresh(db_category)
+        suggestion_index.mark_stale()
         return ResponseHandler.update_success(db_category.name, db_category.id, db_category)
 
     @staticmethod
@@ -47,4 +54,5 @@ class CategoryService:
             ResponseHandler.not_found_error("Category", category_id)
         db.delete(db_category)
         db.commit()
+        suggestion_index.mark_stale()
         return ResponseHandler.delete_success(db_category.name, db_category.id, db_category)
@@ -4,13 +4,19 @@ from app.models.models import ProductFeedback, Product
 from app.schemas.feedback import FeedbackCreate
 from app.utils.responses import ResponseHandler
 from app.core.security import get_current_user
-from typing import List
+from typing import Iterable, List
 from app.services.products import ProductService
+from app.core.cache import recommendation_cache
+from app.core.sampling import product_id_pool
+from app.core.decks import swipe_decks
+from app.core.schema import has_column
+from app.core.hydration import LISTING_COLUMNS, hydrate_products
 
 class FeedbackService:
     @staticmethod
-    def get_random_products(db: Session, limit: int = 10) -> List[Product]:
-        deck_products = db.query(Product).order_by(func.random()).limit(limit).all()
+    def get_random_products(db: Session, limit: int = 10, exclude: Iterable[int] = ()) -> List[Product]:
+        deck_ids = product_id_pool.sample(db, limit, exclude)
+        deck_products, _ = hydrate_products(db, deck_ids, LISTING_COLUMNS)
         transformed_products = [
             ProductService._prepare_product_response(product) 
             for product in deck_products
@@ -18,8 +24,20 @@ class FeedbackService:
 
         return transformed_products
     
-    def get_random_products_recomm(db: Session, limit: int) -> List[Product]:
-        deck_products = db.query(Product).order_by(func.random()).limit(limit).all()
+    @staticmethod
+    def get_swipe_deck(db: Session, user_id: int, limit: int = 10) -> List[Product]:
+        """Next cards from the user's prefetched deck of products they haven't rated"""
+        deck_ids = swipe_decks.pop(db, user_id, limit)
+        deck_products, _ = hydrate_products(db, deck_ids, LISTING_COLUMNS)
+        return [
+            ProductService._prepare_product_response(product)
+            for product in deck_products
+        ]
+
+    @staticmethod
+    def get_random_products_recomm(db: Session, limit: int, exclude: Iterable[int] = ()) -> List[Product]:
+        deck_ids = product_id_pool.sample(db, limit, exclude)
+        deck_products, _ = hydrate_products(db, deck_ids, LISTING_COLUMNS)
 
         transformed_products = [
             ProductService._prepare_product_response(product) 
@@ -44,8 +62,12 @@ class FeedbackService:
         if existing_feedback:
             existing_feedback.liked = feedback.liked
             existing_feedback.rating = feedback.rating
+            if has_column(db, "product_feedback", "updated_at"):
+                existing_feedback.updated_at = func.now()
             db.commit()
             db.refresh(existing_feedback)
+            recommendation_cache.invalidate(user_id)
+            swipe_decks.discard(user_id, feedback.product_id)
             return ResponseHandler.update_success("Feedback", existing_feedback.id, existing_feedback)
 
         # Create new feedback
@@ -59,6 +81,8 @@ class FeedbackService:
         db.add(db_feedback)
         db.commit()
         db.refresh(db_feedback)
+        recommendation_cache.invalidate(user_id)
+        swipe_decks.discard(user_id, feedback.product_id)
         
         return ResponseHandler.create_success("Feedback", db_feedback.id, db_feedback)
 
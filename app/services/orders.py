@@ -4,6 +4,8 @@ from app.schemas.orders import OrderCreate
 from app.utils.responses import ResponseHandler
 from app.core.security import get_current_user
 from fastapi import HTTPException, status
+from app.core.cache import recommendation_cache
+from app.core.sampling import product_id_pool
 
 class OrderService:
     @staticmethod
@@ -61,6 +63,7 @@ class OrderService:
 
         # Convert cart items to order items
         order_items = []
+        sold_out = False
         for cart_item in cart_items_from_cart_id:
             product = db.query(Product).filter(Product.product_id == cart_item.product_id).first()
             if not product:
@@ -87,6 +90,7 @@ class OrderService:
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Insufficient stock for product {product.title}"
                 )
+            sold_out = sold_out or product.stock == 0
 
         db.add_all(order_items)
 
@@ -103,6 +107,11 @@ class OrderService:
         db.commit()
         db.refresh(order_db)
 
+        # Ordered products drop out of this user's recommendations, sold-out ones out of everyone's
+        recommendation_cache.invalidate(user_id)
+        if sold_out:
+            product_id_pool.invalidate()
+
         return ResponseHandler.create_success("Order", order_db.id, order_db)
     
     @staticmethod
@@ -1,3 +1,4 @@
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from app.models.models import Product, Category
 
@@ -7,9 +8,17 @@ from app.utils.upload import upload_image, upload_multiple_images
 from app.schemas.products import ProductCreate, ProductUpdate
 from app.utils.responses import ResponseHandler
 from app.core.config import settings
+from app.core.embeddings import get_embedding_store
+from app.core.indexer import embedding_indexer
+from app.core.keyword_index import keyword_index
+from app.core.suggest import suggestion_index
+from app.core.sampling import product_id_pool
+from app.core.hydration import LISTING_COLUMNS, hydrate_products
+from app.core import text_search
 
 from typing import List
 
+import numpy as np
 
 import json
 
@@ -19,13 +28,12 @@ class ProductService:
         """Convert relative image path to full URL"""
         if not relative_path:
             return None
-        print(f"{settings.BASE_URL}/uploads{relative_path}")
         return f"{settings.BASE_URL}/uploads{relative_path}"
 
     @staticmethod
     def _prepare_product_response(product):
-        """Transform product data to include full image URLs"""
-        product_dict = dict(product.__dict__)
+        """Transform product data (an ORM product or a hydrated row) to include full image URLs"""
+        product_dict = product._asdict() if isinstance(product, Row) else dict(product.__dict__)
         product_dict['thumbnail'] = ProductService._get_full_image_url(product.thumbnail)
 
         product_dict['images'] = [
@@ -34,8 +42,25 @@ class ProductService:
         ] if product.images else []
         return product_dict
 
+    @staticmethod
+    def product_card(product) -> dict:
+        """Search and recommendation card for a product or a row of hydration.CARD_COLUMNS"""
+        return {
+            "id": product.product_id,
+            "title": product.title,
+            "description": product.description,
+            "price": product.price,
+            "thumbnail": ProductService._get_full_image_url(product.thumbnail),
+            "images": [ProductService._get_full_image_url(img) for img in product.images] if product.images else [],
+        }
+
     @staticmethod
     def get_all_products(db: Session, page: int, limit: int, search: str = ""):
+        if search and settings.PRODUCT_SEARCH_MODE == "bm25":
+            return ProductService.search_products(db, page, limit, search)
+        if search and settings.PRODUCT_SEARCH_MODE == "postgres":
+            return ProductService.search_products_postgres(db, page, limit, search)
+
         products = db.query(Product).order_by(Product.id.asc()).filter(
             Product.title.contains(search)).limit(limit).offset((page - 1) * limit).all()
         
@@ -51,6 +76,52 @@ class ProductService:
         
         return {"message": f"Page {page} with {limit} products", "data": transformed_products}
     
+    @staticmethod
+    def keyword_product_ids(db: Session, search: str, limit: int) -> List[int]:
+        """Best ``limit`` product ids for a keyword query under PRODUCT_SEARCH_MODE"""
+        if settings.PRODUCT_SEARCH_MODE == "bm25":
+            _, product_ids = keyword_index.get(db).search(search, 0, limit)
+            return product_ids
+
+        if settings.PRODUCT_SEARCH_MODE == "postgres":
+            query = text_search.ranked(db.query(Product.product_id), Product, search)
+        else:
+            query = db.query(Product.product_id).order_by(Product.id.asc()).filter(Product.title.contains(search))
+        return [product_id for product_id, in query.limit(limit)]
+
+    @staticmethod
+    def search_products(db: Session, page: int, limit: int, search: str):
+        """Products matching ``search`` in title or description, ranked by BM25"""
+        total, product_ids = keyword_index.get(db).search(search, (page - 1) * limit, limit)
+        products, _ = hydrate_products(db, product_ids, LISTING_COLUMNS)
+
+        transformed_products = [
+            ProductService._prepare_product_response(product)
+            for product in products
+        ]
+        return {
+            "message": f"Page {page} with {limit} of {total} products matching '{search}'",
+            "data": transformed_products,
+            "total": total,
+        }
+
+    @staticmethod
+    def search_products_postgres(db: Session, page: int, limit: int, search: str):
+        """Products matching ``search``, ranked by Postgres full-text and trigram similarity"""
+        query = text_search.ranked(db.query(Product), Product, search)
+        total = query.order_by(None).count()
+        products = query.limit(limit).offset((page - 1) * limit).all()
+
+        transformed_products = [
+            ProductService._prepare_product_response(product)
+            for product in products
+        ]
+        return {
+            "message": f"Page {page} with {limit} of {total} products matching '{search}'",
+            "data": transformed_products,
+            "total": total,
+        }
+
     @staticmethod
     def get_product(db: Session, product_id: int):
         product = db.query(Product).filter(Product.product_id == product_id).first()  # Use product_id instead of id
@@ -61,6 +132,35 @@ class ProductService:
         transformed_product = ProductService._prepare_product_response(product)
         return ResponseHandler.get_single_success(product.title, product_id, transformed_product)
     
+    @staticmethod
+    def get_similar_products(db: Session, product_id: int, limit: int = 10):
+        """Products whose images are closest to the given product's thumbnail"""
+        product = db.query(Product).filter(Product.product_id == product_id).first()
+        if not product:
+            ResponseHandler.not_found_error("Product", product_id)
+
+        store = get_embedding_store().snapshot
+        row = store.row_for_product_id(product_id)
+        if row is None:
+            return {"message": f"No similar products found for product {product_id}", "data": []}
+
+        exclude = np.zeros(len(store.image_embeddings), dtype=bool)
+        exclude[row] = True
+        neighbours = store.lookup_neighbours([row], limit, exclude)
+        if neighbours is not None:
+            similar_rows, _ = neighbours
+        else:
+            similar_rows, _ = store.search_images(store.image_embeddings[row], limit, exclude)
+
+        similar_rows = similar_rows[0][similar_rows[0] >= 0]
+        products, _ = hydrate_products(db, store.product_ids_for_rows(similar_rows), LISTING_COLUMNS)
+
+        transformed_products = [
+            ProductService._prepare_product_response(similar)
+            for similar in products
+        ]
+        return {"message": f"Products similar to product {product_id}", "data": transformed_products}
+
     @staticmethod
     # async def create_product(db: Session, product: ProductCreate, thumbnail: UploadFile, images: List[UploadFile]):
     #     category_exists = db.query(Category).filter(Category.id == product.category_id).first()
@@ -102,6 +202,10 @@ class ProductService:
         db.add(db_product)
         db.commit()
         db.refresh(db_product)
+        product_id_pool.invalidate()
+        embedding_indexer.enqueue(db_product.product_id, db_product.thumbnail, db_product.description)
+        keyword_index.add_product(db_product)
+        suggestion_index.mark_stale()
         return ResponseHandler.create_success(db_product.title, db_product.product_id, db_product)
 
     @staticmethod
@@ -127,6 +231,11 @@ class ProductService:
 
         db.commit()
         db.refresh(db_product)
+        product_id_pool.invalidate()
+        if thumbnail:
+            embedding_indexer.enqueue(db_product.product_id, db_product.thumbnail, db_product.description)
+        keyword_index.add_product(db_product)
+        suggestion_index.mark_stale()
         return ResponseHandler.update_success(db_product.title, db_product.product_id, db_product)
     
     @staticmethod
@@ -137,4 +246,7 @@ class ProductService:
             ResponseHandler.not_found_error("Product", product_id)
         db.delete(db_product)
         db.commit()
+        product_id_pool.invalidate()
+        keyword_index.remove_product(db_product.product_id)
+        suggestion_index.mark_stale()
         return ResponseHandler.delete_success(db_product.title, db_product.product_id, db_product)
\ No newline at end of file
@@ -1,104 +1,182 @@
-import pandas as pd
 import numpy as np
 from requests import Session
-from sqlalchemy import func
 from app.services.feedback import FeedbackService
-from app.models.models import ProductFeedback, Product
+from app.models.models import ProductFeedback
 from app.services.products import ProductService
+from app.core.embeddings import get_embedding_store
+from app.core.config import settings
+from app.core import vector_search
+from app.core.diversity import mmr, rank_relevance
+from app.core.cache import recommendation_cache
+from app.core.exclusions import excluded_product_ids, exclusion_mask
+from app.core.precomputed import precomputed_recommendations
+from app.core.sampling import product_id_pool
+from app.core.hydration import CARD_COLUMNS, hydrate_products
+from app.core.schema import has_column
+from datetime import datetime, timezone
+from sqlalchemy import or_
 
 class RecommendationService:
     def __init__(self, db: Session):
         self.db = db
-        self.metadata = pd.read_csv('/path/to/metadata2.csv')  
+        # One snapshot per request, so appends and refreshes never change row counts mid-way
+        self.store = get_embedding_store().snapshot
+        self.metadata = self.store.metadata
+
+    def _similar_rows(self, seed_rows, k: int, aggregation: str, text_weight: float = 0.0,
+                      exclude: np.ndarray = None):
+        """Rank catalog rows against all liked seeds in a single batched pass.
+
+        The neighbour table and the ANN/quantized indexes only cover image
+        similarity, so a non-zero ``text_weight`` always scores the full
+        blended matrices. ``exclude`` is a boolean mask over rows applied
+        before top-k; the seeds are always excluded. Returns ``(rows, scores)``
+        best first.
+        """
+        if not seed_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        seed_rows = np.asarray(seed_rows, dtype=np.int64)
+        image_embeddings = self.store.image_embeddings
+        if exclude is None:
+            exclude = np.zeros(len(image_embeddings), dtype=bool)
+        else:
+            exclude = exclude.copy()
+        exclude[seed_rows] = True
+
+        if text_weight:
+            text_embeddings = self.store.text_embeddings
+            scores = vector_search.blended_scores(
+                image_embeddings, image_embeddings[seed_rows],
+                text_embeddings, text_embeddings[seed_rows], text_weight
+            )
+            return vector_search.top_k_aggregated(scores, k, aggregation, exclude=exclude)
+
+        neighbours = self.store.lookup_neighbours(seed_rows, k, exclude)
+        if neighbours is not None:
+            candidates, _ = neighbours
+            return vector_search.rescore_candidates(
+                image_embeddings, image_embeddings[seed_rows], candidates, k, aggregation
+            )
 
-    def get_recommendations(self, user_id: int, top_k: int = 3):
+        if self.store.search_mode != "exact":
+            candidates, scores = self.store.search_images(image_embeddings[seed_rows], k, exclude)
+            return vector_search.aggregate_candidates(candidates, scores, k, aggregation)
+
+        scores = vector_search.blended_scores(image_embeddings, image_embeddings[seed_rows])
+        return vector_search.top_k_aggregated(scores, k, aggregation, exclude=exclude)
+
+    def _diversify(self, rows: np.ndarray, relevance: np.ndarray, k: int, lambda_: float) -> np.ndarray:
+        """Re-rank candidate rows by maximal marginal relevance over their image embeddings"""
+        if not len(rows):
+            return rows
+        order = mmr(self.store.image_embeddings[rows], relevance, k, lambda_)
+        return rows[order]
+
+    def get_recommendations(self, user_id: int, top_k: int = 3, aggregation: str = None,
+                            text_weight: float = None, diversity: float = None):
+        """``diversity`` is the MMR lambda; 1 keeps the pure relevance order"""
+        aggregation = aggregation or settings.RECOMMENDATION_AGGREGATION
+        if text_weight is None:
+            text_weight = settings.RECOMMENDATION_TEXT_WEIGHT
+        if diversity is None:
+            diversity = settings.RECOMMENDATION_DIVERSITY_LAMBDA
+
+        # One cache entry per user so feedback can drop every variant at once
+        variant = (top_k, aggregation, text_weight, diversity)
+        cached = recommendation_cache.get(user_id) or {}
+        if variant in cached:
+            return cached[variant]
+
+        result = self._compute_recommendations(user_id, top_k, aggregation, text_weight, diversity)
+        recommendation_cache.set(user_id, {**cached, variant: result})
+        return result
+
+    def _liked_rows(self, user_id: int):
+        """Embedding rows of the user's most recent likes, None if they have none"""
         liked_feedback = self.db.query(ProductFeedback).filter(
             ProductFeedback.user_id == user_id,
             ProductFeedback.liked == True
         ).order_by(ProductFeedback.created_at.desc()).limit(10).all()
 
         if not liked_feedback:
-            return FeedbackService.get_random_products_recomm(self.db, 20)
-
-        liked_product_ids = [feedback.product_id for feedback in liked_feedback]
-        products = self.db.query(Product).filter(Product.product_id.in_(liked_product_ids)).all()
-
-
-        liked_images = []
-        indices = []
-        for product in products:
-            thumbnail_path = product.thumbnail  
-            image_name = thumbnail_path.split('/')[-1]  # Extract number.jpg
-            matched_rows = self.metadata[self.metadata['image_path'].str.endswith(image_name)]
-            if not matched_rows.empty:
-                liked_images.append(matched_rows['image_path'].values[0])  # Get the image path
-                indices.append(matched_rows.index[0])  # Get the index in metadata
-
-        
-        print(liked_images) 
-        print(indices)
-
-        image_embeddings = np.load('/path/to//image_embeddings.npy')  
-        text_embeddings = np.load('/path/to//text_embeddings.npy')  
-        
-        similar_idx_all_liked = []
-        for index in indices:
-            similarity_scores = image_embeddings[index].dot(image_embeddings.T)
-            top_indices = np.argsort(similarity_scores)[::-1][:top_k]
-            similar_idx_all_liked.extend(top_indices)
-        
-        similar_idx_all_liked = list(dict.fromkeys(similar_idx_all_liked))
-
-
-        result_paths = [
-            self.metadata.loc[idx, "image_path"].replace("/content/new/", "/products/") 
-            for idx in similar_idx_all_liked
-        ]
-        
-        print(result_paths)
+            return None
+
+        rows = [self.store.row_for_product_id(feedback.product_id) for feedback in liked_feedback]
+        return [row for row in rows if row is not None]
+
+    def _precomputed_rows(self, user_id: int, top_k: int, aggregation: str, text_weight: float):
+        """(seed rows, recommended rows) from the batch run, unless the user was active since"""
+        precomputed = precomputed_recommendations.get()
+        if precomputed is None or not precomputed.matches(top_k, aggregation, text_weight):
+            return None
+
+        result = precomputed.lookup(user_id)
+        if result is None:
+            return None
+
+        # New feedback or a like flipped in place since the batch run makes the list stale;
+        # edits are only tracked once the updated_at migration has been run
+        generated_at = datetime.fromtimestamp(precomputed.generated_at, tz=timezone.utc)
+        changed = ProductFeedback.created_at > generated_at
+        if has_column(self.db, "product_feedback", "updated_at"):
+            changed = or_(changed, ProductFeedback.updated_at > generated_at)
+        fresh_activity = self.db.query(ProductFeedback.id).filter(
+            ProductFeedback.user_id == user_id, changed
+        ).first()
+        return None if fresh_activity else result
+
+    def _compute_recommendations(self, user_id: int, top_k: int, aggregation: str, text_weight: float,
+                                 diversity_lambda: float = 1.0):
+        # Liked, disliked and ordered products plus everything unavailable, masked before top-k
+        excluded_ids = excluded_product_ids(self.db, user_id)
+        exclude = exclusion_mask(self.db, self.store, user_id, excluded_ids)
+
+        precomputed = self._precomputed_rows(user_id, top_k, aggregation, text_weight)
+        diversify = diversity_lambda < 1.0
+        if precomputed is not None:
+            indices, similar_rows = precomputed
+            similar_rows = np.asarray(similar_rows, dtype=np.int64)
+            # The batch run masked the same products; this only drops ones unavailable since
+            similar_rows = similar_rows[~exclude[similar_rows]]
+            n_results = len(similar_rows)
+            relevance = rank_relevance(n_results)
+        else:
+            indices = self._liked_rows(user_id)
+            if indices is None:
+                return FeedbackService.get_random_products_recomm(self.db, 20, exclude=excluded_ids)
+            n_results = top_k * len(indices)
+            # MMR needs a wider candidate set than it returns
+            n_candidates = max(n_results, settings.DIVERSITY_CANDIDATES) if diversify else n_results
+            similar_rows, relevance = self._similar_rows(
+                indices, n_candidates, aggregation, text_weight, exclude
+            )
+
+        if diversify:
+            similar_rows = self._diversify(similar_rows, relevance, n_results, diversity_lambda)
+        similar_idx_all_liked = similar_rows.tolist()
+
+        liked_images = [self.metadata.at[row, 'image_path'] for row in indices]
+
 
         ### The key of product data is id which should be product_id for consistent naming. Value okay ###
 
-        # Retrieve product data based on the result_paths
-        products_data = self.db.query(Product).filter(Product.thumbnail.in_(result_paths)).all()
-        products_info = [
-            {
-                "id": product.product_id,
-                "title": product.title,
-                "description": product.description,
-                "price": product.price,
-                "thumbnail": ProductService._get_full_image_url(product.thumbnail),
-                "images": [ProductService._get_full_image_url(img) for img in product.images] if product.images else [],
-            }
-            for product in products_data
-        ]
+        # Retrieve product data by product_id, keeping the ranking order
+        result_product_ids = self.store.product_ids_for_rows(similar_idx_all_liked)
+        products_data, _ = hydrate_products(self.db, result_product_ids, CARD_COLUMNS)
+        products_info = [ProductService.product_card(product) for product in products_data]
 
         min_recommendations = 20
         if len(products_info) < min_recommendations:
-            existing_product_ids = {product['product_id'] for product in products_info}
+            existing_product_ids = {product['id'] for product in products_info}
+            existing_product_ids.update(excluded_ids.tolist())
             additional_count = min_recommendations - len(products_info)
             
 
             ### Business logic replaced by random function ###  
-            additional_products = (
-                self.db.query(Product)
-                .filter(Product.product_id.notin_(existing_product_ids))
-                .order_by(func.random())
-                .limit(additional_count)
-                .all()
-            )
-
-            additional_products_info = [
-                {
-                    "id": product.product_id,
-                    "title": product.title,
-                    "description": product.description,
-                    "price": product.price,
-                    "thumbnail": ProductService._get_full_image_url(product.thumbnail),
-                    "images": [ProductService._get_full_image_url(img) for img in product.images] if product.images else [],
-                }
-                for product in additional_products
-            ]
+            additional_ids = product_id_pool.sample(self.db, additional_count, exclude=existing_product_ids)
+            additional_products, _ = hydrate_products(self.db, additional_ids, CARD_COLUMNS)
+            additional_products_info = [ProductService.product_card(product) for product in additional_products]
 
             products_info.extend(additional_products_info)
 
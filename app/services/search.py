@@ -1,10 +1,19 @@
 from fastapi import Form, HTTPException, File, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import requests
 from app.models.models import Product
 from app.services.products import ProductService
 from app.core.config import settings
+from app.core.embeddings import get_embedding_store
+from app.core.diversity import mmr, rank_relevance
+from app.core.vector_search import reciprocal_rank_fusion
+from app.core.search_engine import get_search_engine
+from app.core.cache import search_cache, normalize_query
+from app.core.suggest import suggestion_index
+from app.core.hydration import CARD_COLUMNS, hydrate_products
+from app.utils.upload import read_upload_with_digest
+import numpy as np
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -124,30 +133,22 @@ class SearchService:
     @staticmethod
     async def search_products_by_text(
         db: Session,
-        text_query: str
+        text_query: str,
+        diversity: Optional[float] = None
     ) -> dict:
         try:
-            # Prepare data for the external API
-            data = {'text_query': text_query}
-            print(f"Text query data: {data}")
-
-            # Make request to the external search API
-            response = requests.post(
-                f"{settings.SEARCH_API_URL}/search",
-                data=data
-            )
-
-            print(f"External API response status: {response.status_code}")
-            print(f"External API response content: {response.text}")
-
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="External search API error"
-                )
-
-            return SearchService._process_search_results(db, response)
-
+            diversity = SearchService._diversity(diversity)
+            cache_key = ("text", normalize_query(text_query), diversity)
+            product_ids = search_cache.get(cache_key)
+            if product_ids is None:
+                rows = await get_search_engine().search_text(text_query)
+                product_ids = SearchService._ranked_product_ids(rows, diversity)
+                search_cache.set(cache_key, product_ids)
+
+            return SearchService._process_search_results(db, product_ids)
+
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Error during text search operation: {str(e)}")
             logger.error(f"Text search error: {str(e)}")
@@ -159,35 +160,26 @@ class SearchService:
     @staticmethod
     async def search_products_by_image(
         db: Session,
-        image: UploadFile
+        image: UploadFile,
+        diversity: Optional[float] = None
     ) -> dict:
         try:
-            file_content = await image.read()
-            files = {
-                'image': (
-                    image.filename,
-                    file_content,
-                    image.content_type
-                )
-            }
+            file_content, digest = await read_upload_with_digest(image)
             print(f"File prepared with filename: {image.filename}, size: {len(file_content)} bytes, content_type: {image.content_type}")
 
-            response = requests.post(
-                f"{settings.SEARCH_API_URL}/search",
-                files=files
-            )
-
-            print(f"External API response status: {response.status_code}")
-            print(f"External API response content: {response.text}")
+            # Identical uploads share a cache entry whatever their filename
+            diversity = SearchService._diversity(diversity)
+            cache_key = ("image", digest, diversity)
+            product_ids = search_cache.get(cache_key)
+            if product_ids is None:
+                rows = await get_search_engine().search_image(file_content, image.filename, image.content_type)
+                product_ids = SearchService._ranked_product_ids(rows, diversity)
+                search_cache.set(cache_key, product_ids)
 
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="External search API error"
-                )
-
-            return SearchService._process_search_results(db, response)
+            return SearchService._process_search_results(db, product_ids)
 
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Error during image search operation: {str(e)}")
             logger.error(f"Image search error: {str(e)}")
@@ -197,36 +189,99 @@ class SearchService:
             )
 
     @staticmethod
-    def _process_search_results(db: Session, response: requests.Response) -> dict:
-        product_paths = response.json().get('paths', [])
-        print(f"Product paths from external API: {product_paths}")
+    async def search_products_hybrid(db: Session, text_query: str) -> dict:
+        """Keyword and embedding search run concurrently, fused with reciprocal-rank fusion"""
+        try:
+            cache_key = ("hybrid", normalize_query(text_query))
+            product_ids = search_cache.get(cache_key)
+            if product_ids is None:
+                product_ids, complete = await SearchService._hybrid_product_ids(db, text_query)
+                # A ranking missing a retriever is served but not cached, so the next query retries it
+                if complete:
+                    search_cache.set(cache_key, product_ids)
+
+            return SearchService._process_search_results(db, product_ids)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Hybrid search error: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Hybrid search operation failed: {str(e)}"
+            )
 
-        if not product_paths:
+    @staticmethod
+    async def _hybrid_product_ids(db: Session, text_query: str):
+        """(fused product ids, whether both retrievers answered)"""
+        keyword_ids, rows = await asyncio.gather(
+            asyncio.to_thread(
+                ProductService.keyword_product_ids, db, text_query, settings.HYBRID_LEXICAL_CANDIDATES
+            ),
+            get_search_engine().search_text(text_query),
+            return_exceptions=True,
+        )
+
+        rankings, weights, errors = [], [], []
+        for name, result, weight in (
+            ("keyword", keyword_ids, settings.HYBRID_LEXICAL_WEIGHT),
+            ("vector", rows, settings.HYBRID_VECTOR_WEIGHT),
+        ):
+            if isinstance(result, Exception):
+                logger.warning(f"Hybrid search {name} retriever failed: {result}")
+                errors.append(result)
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            if name == "vector":
+                result = get_embedding_store().snapshot.product_ids_for_rows(result)
+            rankings.append(result)
+            weights.append(weight)
+
+        if not rankings:
+            raise errors[-1]
+        return reciprocal_rank_fusion(rankings, weights, limit=settings.SEARCH_TOP_K), not errors
+
+    @staticmethod
+    def suggest(db: Session, prefix: str, limit: int) -> dict:
+        """Autocomplete suggestions for a partially typed query"""
+        return {
+            "message": f"Suggestions for '{prefix}'",
+            "data": suggestion_index.suggest(db, prefix, limit)
+        }
+
+    @staticmethod
+    def _diversity(diversity: Optional[float]) -> float:
+        return settings.SEARCH_DIVERSITY_LAMBDA if diversity is None else diversity
+
+    @staticmethod
+    def _ranked_product_ids(rows: List[int], diversity: float) -> List[int]:
+        """Product ids for ranked embedding rows from either engine, optionally diversified"""
+        store = get_embedding_store().snapshot
+        rows = np.asarray(rows, dtype=np.int64)
+
+        if diversity < 1.0 and len(rows):
+            # Engines return a ranking without scores, so relevance comes from the rank
+            candidates = rows[:settings.DIVERSITY_CANDIDATES]
+            order = mmr(store.image_embeddings[candidates], rank_relevance(len(candidates)), len(candidates), diversity)
+            rows = np.concatenate([candidates[order], rows[settings.DIVERSITY_CANDIDATES:]])
+
+        return store.product_ids_for_rows(rows)
+
+    @staticmethod
+    def _process_search_results(db: Session, product_ids: List[int]) -> dict:
+        """Hydrate a ranked product id list into products, keeping its order"""
+        if not product_ids:
             return {
                 "message": "No matching products found",
                 "data": []
             }
 
-
-        products = db.query(Product).filter(
-            Product.thumbnail.in_(product_paths)
-        ).all()
-        print(f"Products retrieved: {[product.thumbnail for product in products]}")
-
-        transformed_products = []
-        for product in products:
-            product_dict = {
-                "id": product.product_id,
-                "title": product.title,
-                "description": product.description,
-                "price": product.price,
-                "thumbnail": ProductService._get_full_image_url(product.thumbnail),
-                "images": [ProductService._get_full_image_url(img) for img in product.images] if product.images else [],
-            }
-            transformed_products.append(product_dict)
+        # Missing ids (products deleted since they were ranked or cached) are logged and skipped
+        rows, _ = hydrate_products(db, product_ids, CARD_COLUMNS)
+        transformed_products = [ProductService.product_card(row) for row in rows]
 
         return {
             "message": "Search results retrieved successfully",
             "data": transformed_products
         }
-    
\ No newline at end of file
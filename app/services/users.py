@@ -3,13 +3,17 @@ from app.models.models import User
 from app.schemas.users import UserCreate, UserUpdate
 from app.utils.responses import ResponseHandler
 from app.core.security import get_password_hash
+from app.core import text_search
 
 
 class UserService:
     @staticmethod
     def get_all_users(db: Session, page: int, limit: int, search: str = "", role: str = "user"):
-        users = db.query(User).order_by(User.id.asc()).filter(
-            User.username.contains(search), User.role == role).limit(limit).offset((page - 1) * limit).all()
+        if search and text_search.enabled():
+            query = text_search.ranked(db.query(User).filter(User.role == role), User, search)
+        else:
+            query = db.query(User).order_by(User.id.asc()).filter(User.username.contains(search), User.role == role)
+        users = query.limit(limit).offset((page - 1) * limit).all()
         return {"message": f"Page {page} with {limit} users", "data": users}
 
     @staticmethod
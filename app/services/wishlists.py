@@ -4,6 +4,7 @@ from app.schemas.wishlists import WishlistItemCreate
 from app.services.products import ProductService
 from app.utils.responses import ResponseHandler
 from app.core.security import get_current_user
+from app.core.hydration import LISTING_COLUMNS, hydrate_products
 from fastapi import HTTPException, status
 
 class WishlistService:
@@ -12,11 +13,18 @@ class WishlistService:
         print(token)
         user_id = get_current_user(token)
         wishlist_items = db.query(Wishlist).filter(Wishlist.user_id == user_id).offset((page - 1) * limit).limit(limit).all()
+
+        # One query for every item's product instead of a lazy load per item
+        products, _ = hydrate_products(db, [item.product_id for item in wishlist_items], LISTING_COLUMNS)
+        products_by_id = {product.product_id: product for product in products}
+
         transformed_items = []
         for item in wishlist_items:
+            product = products_by_id.get(item.product_id)
+            if product is None:
+                continue
             item_dict = dict(item.__dict__)
-            if item.product:
-                item_dict['product'] = ProductService._prepare_product_response(item.product)
+            item_dict['product'] = ProductService._prepare_product_response(product)
             transformed_items.append(item_dict)  
         return {"message": f"Page {page} with {limit} wishlist items", "data": transformed_items}
 
@@ -36,7 +36,8 @@
 
 
 from fastapi import UploadFile
-from typing import List
+from typing import List, Tuple
+import hashlib
 import os
 import uuid
 import shutil
@@ -65,4 +66,17 @@ async def upload_multiple_images(files: List[UploadFile]) -> List[str]:
         urls.append(url)
 
     # Return list relative paths that will be stored in database
-    return urls
\ No newline at end of file
+    return urls
+
+
+async def read_upload_with_digest(file: UploadFile, chunk_size: int = 1024 * 1024) -> Tuple[bytes, str]:
+    """Read an upload in chunks, hashing it on the way; returns (content, sha256 hex digest)"""
+    digest = hashlib.sha256()
+    chunks = []
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
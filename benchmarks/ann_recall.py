@@ -0,0 +1,78 @@
+"""Recall@k vs latency of the IVF index against exact search.
+
+    python -m benchmarks.ann_recall [--k 10] [--synthetic 500000]
+
+Runs on the shipped image_embeddings.npy by default. ``--synthetic N``
+grows the catalog to N vectors by jittering the shipped embeddings, to
+show how both paths scale towards a large catalog.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.ann import IVFIndex
+from app.core.vector_search import exact_search
+
+
+def synthetic_catalog(base: np.ndarray, size: int, noise: float, rng) -> np.ndarray:
+    rows = rng.integers(0, len(base), size)
+    vectors = base[rows] + rng.normal(0, noise, (size, base.shape[1])).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def timed_search(search, queries):
+    latencies = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        rows, _ = search(query[None, :])
+        latencies.append(time.perf_counter() - started)
+        results.append(rows[0])
+    return np.array(results), np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF recall/latency benchmark")
+    parser.add_argument("--embeddings", default="image_embeddings.npy")
+    parser.add_argument("--synthetic", type=int, default=0, help="Synthetic catalog size")
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=0)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = np.load(args.embeddings).astype(np.float32)
+    if args.synthetic:
+        vectors = synthetic_catalog(vectors, args.synthetic, args.noise, rng)
+
+    queries = synthetic_catalog(vectors, args.queries, 0.05, rng)
+
+    started = time.perf_counter()
+    index = IVFIndex.build(vectors, n_lists=args.n_lists)
+    build_seconds = time.perf_counter() - started
+
+    truth, exact_ms = timed_search(lambda q: exact_search(vectors, q, args.k), queries)
+
+    print(f"catalog={len(vectors)} dim={vectors.shape[1]} lists={index.n_lists} "
+          f"k={args.k} queries={len(queries)} build={build_seconds:.2f}s")
+    print(f"{'mode':<12}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'max scan':>10}")
+    print(f"{'exact':<12}{1.0:>10.3f}{np.percentile(exact_ms, 50):>10.3f}"
+          f"{np.percentile(exact_ms, 95):>10.3f}{1.0:>10.1%}")
+
+    list_sizes = np.diff(index.list_offsets)
+    for nprobe in args.nprobe:
+        if nprobe > index.n_lists:
+            continue
+        found, ann_ms = timed_search(lambda q: index.search(q, args.k, nprobe=nprobe), queries)
+        recall = np.mean([len(np.intersect1d(f, t)) / args.k for f, t in zip(found, truth)])
+        scanned = np.sort(list_sizes)[::-1][:nprobe].sum() / len(vectors)
+        print(f"{'ivf/' + str(nprobe):<12}{recall:>10.3f}{np.percentile(ann_ms, 50):>10.3f}"
+              f"{np.percentile(ann_ms, 95):>10.3f}{scanned:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
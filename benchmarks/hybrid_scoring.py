@@ -0,0 +1,64 @@
+"""Latency of hybrid text+image scoring against image-only scoring.
+
+    python -m benchmarks.hybrid_scoring [--synthetic 200000] [--text-weight 0.3]
+
+Times the recommender's scoring step (blended score matrix, aggregation
+and top-k) for 1, 5 and 10 liked seeds on the shipped embeddings, or on a
+catalog jittered up to ``--synthetic`` rows.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core import vector_search
+
+
+def jitter(base: np.ndarray, rows: np.ndarray, rng) -> np.ndarray:
+    vectors = base[rows] + rng.normal(0, 0.02, (len(rows), base.shape[1])).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def time_scoring(image, text, seeds, text_weight, k, repeats):
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        scores = vector_search.blended_scores(
+            image, image[seeds], text, text[seeds] if text_weight else None, text_weight
+        )
+        vector_search.top_k_aggregated(scores, k, "rrf", exclude=seeds)
+        latencies.append(time.perf_counter() - started)
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid scoring benchmark")
+    parser.add_argument("--image-embeddings", default="image_embeddings.npy")
+    parser.add_argument("--text-embeddings", default="text_embeddings.npy")
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--text-weight", type=float, default=0.3)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    image = np.load(args.image_embeddings).astype(np.float32)
+    text = np.load(args.text_embeddings).astype(np.float32)
+    if args.synthetic:
+        rows = rng.integers(0, len(image), args.synthetic)
+        image, text = jitter(image, rows, rng), jitter(text, rows, rng)
+
+    print(f"catalog={len(image)} dim={image.shape[1]} text_weight={args.text_weight}")
+    print(f"{'seeds':>6}{'image p50':>12}{'hybrid p50':>12}{'image p95':>12}{'hybrid p95':>12}{'overhead':>10}")
+    for n_seeds in (1, 5, 10):
+        seeds = rng.choice(len(image), n_seeds, replace=False)
+        k = 3 * n_seeds
+        image_ms = time_scoring(image, text, seeds, 0.0, k, args.repeats)
+        hybrid_ms = time_scoring(image, text, seeds, args.text_weight, k, args.repeats)
+        overhead = np.median(hybrid_ms) / np.median(image_ms)
+        print(f"{n_seeds:>6}{np.median(image_ms):>12.3f}{np.median(hybrid_ms):>12.3f}"
+              f"{np.percentile(image_ms, 95):>12.3f}{np.percentile(hybrid_ms, 95):>12.3f}{overhead:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
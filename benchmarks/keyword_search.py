@@ -0,0 +1,99 @@
+"""Ranked BM25 keyword search against the LIKE title scan it replaces.
+
+    python -m benchmarks.keyword_search [--products 100000] [--queries 200]
+
+Builds a synthetic catalog by recombining words from the descriptions in
+metadata2.csv into titles and descriptions, loads it into an in-memory
+SQLite table, and times a page of results per query from both paths: the
+old ``title LIKE '%query%'`` listing (plus its count) and the in-process
+BM25 index. Also reports the index build time and memory.
+"""
+import argparse
+import sqlite3
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.core.keyword_index import BM25Index, tokenize
+
+
+def synthetic_catalog(vocabulary, size: int, rng):
+    """(product_id, title, description) rows of 3-6 and 15-40 words"""
+    words = np.asarray(vocabulary, dtype=object)
+    catalog = []
+    for product_id in range(1, size + 1):
+        title = " ".join(words[rng.integers(0, len(words), rng.integers(3, 7))])
+        description = " ".join(words[rng.integers(0, len(words), rng.integers(15, 41))])
+        catalog.append((product_id, title, description))
+    return catalog
+
+
+def percentiles(latencies):
+    latencies = np.asarray(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 vs LIKE keyword search benchmark")
+    parser.add_argument("--metadata", default="metadata2.csv")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = sorted({
+        token
+        for description in pd.read_csv(args.metadata)["description"].dropna()
+        for token in tokenize(description)
+        if len(token) > 2
+    })
+    catalog = synthetic_catalog(vocabulary, args.products, rng)
+
+    # Titles of one or two words, the way shoppers type them
+    queries = []
+    for _ in range(args.queries):
+        title_words = catalog[rng.integers(0, len(catalog))][1].split()
+        start = rng.integers(0, len(title_words))
+        queries.append(" ".join(title_words[start:start + rng.integers(1, 3)]))
+
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, title TEXT, description TEXT)")
+    db.executemany("INSERT INTO products VALUES (?, ?, ?)", catalog)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = BM25Index.from_documents(catalog)
+    build_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    like_latencies, like_matches = [], []
+    bm25_latencies, bm25_matches = [], []
+    for query in queries:
+        pattern = f"%{query}%"
+        started = time.perf_counter()
+        db.execute(
+            "SELECT * FROM products WHERE title LIKE ? ORDER BY id LIMIT ?", (pattern, args.limit)
+        ).fetchall()
+        (total,) = db.execute("SELECT COUNT(*) FROM products WHERE title LIKE ?", (pattern,)).fetchone()
+        like_latencies.append(time.perf_counter() - started)
+        like_matches.append(total)
+
+        started = time.perf_counter()
+        total, _ = index.search(query, 0, args.limit)
+        bm25_latencies.append(time.perf_counter() - started)
+        bm25_matches.append(total)
+
+    print(f"products={len(catalog)} vocabulary={len(vocabulary)} queries={len(queries)} limit={args.limit}")
+    print(f"bm25 build {build_seconds:.2f}s, peak {peak / 2**20:.1f} MB")
+    print(f"{'path':>6}{'p50 ms':>10}{'p95 ms':>10}{'matches':>10}")
+    for name, latencies, matches in (("like", like_latencies, like_matches), ("bm25", bm25_latencies, bm25_matches)):
+        p50, p95 = percentiles(latencies)
+        print(f"{name:>6}{p50:>10.3f}{p95:>10.3f}{np.mean(matches):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Cost and effect of MMR diversity re-ranking.
+
+    python -m benchmarks.mmr_rerank [--candidates 300] [--lambda 0.7]
+
+Picks K = 20, 50 and 100 results out of the top ``--candidates`` neighbours
+of random seeds in the shipped image embeddings and reports the re-ranking
+latency next to the mean pairwise similarity of the returned lists, with
+and without MMR.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core import vector_search
+from app.core.diversity import mmr
+
+
+def mean_pairwise_similarity(vectors: np.ndarray) -> float:
+    similarity = vectors @ vectors.T
+    n = len(vectors)
+    return float((similarity.sum() - np.trace(similarity)) / (n * (n - 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMR re-ranking benchmark")
+    parser.add_argument("--embeddings", default="image_embeddings.npy")
+    parser.add_argument("--candidates", type=int, default=300)
+    parser.add_argument("--lambda", dest="lambda_", type=float, default=0.7)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = np.load(args.embeddings).astype(np.float32)
+    seeds = rng.choice(len(vectors), args.queries, replace=False)
+    candidate_rows, candidate_scores = vector_search.exact_search(vectors, vectors[seeds], args.candidates + 1)
+    # Drop each seed's own row
+    candidate_rows, candidate_scores = candidate_rows[:, 1:], candidate_scores[:, 1:]
+
+    print(f"catalog={len(vectors)} candidates={candidate_rows.shape[1]} lambda={args.lambda_}")
+    print(f"{'K':>5}{'p50 ms':>10}{'p95 ms':>10}{'sim top-K':>12}{'sim MMR':>10}")
+    for k in (20, 50, 100):
+        latencies, plain_similarity, mmr_similarity = [], [], []
+        for rows, scores in zip(candidate_rows, candidate_scores):
+            started = time.perf_counter()
+            candidates = vectors[rows]
+            order = mmr(candidates, scores, k, args.lambda_)
+            latencies.append(time.perf_counter() - started)
+
+            plain_similarity.append(mean_pairwise_similarity(candidates[:k]))
+            mmr_similarity.append(mean_pairwise_similarity(candidates[order]))
+
+        latencies = np.array(latencies) * 1000
+        print(f"{k:>5}{np.median(latencies):>10.3f}{np.percentile(latencies, 95):>10.3f}"
+              f"{np.mean(plain_similarity):>12.3f}{np.mean(mmr_similarity):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
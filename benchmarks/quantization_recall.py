@@ -0,0 +1,68 @@
+"""Recall, latency and memory of quantized search against exact float32 search.
+
+    python -m benchmarks.quantization_recall [--synthetic 200000] [--k 10]
+
+For float16 and per-dimension int8 codes, reports recall@k of the raw
+quantized ranking and after exact rescoring of the top candidates, the
+per-query latency and the resident size of the scanned matrix.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.quantization import QUANTIZATIONS, QuantizedMatrix
+from app.core.vector_search import exact_search
+
+
+def jitter(base: np.ndarray, size: int, noise: float, rng) -> np.ndarray:
+    vectors = base[rng.integers(0, len(base), size)]
+    vectors = vectors + rng.normal(0, noise, vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def timed(search, queries):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        rows, _ = search(query)
+        latencies.append(time.perf_counter() - started)
+        results.append(rows[0])
+    return np.array(results), np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized search benchmark")
+    parser.add_argument("--embeddings", default="image_embeddings.npy")
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, 50, 200])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = np.load(args.embeddings).astype(np.float32)
+    if args.synthetic:
+        vectors = jitter(vectors, args.synthetic, 0.02, rng)
+    queries = jitter(vectors, args.queries, 0.05, rng)
+
+    truth, exact_ms = timed(lambda q: exact_search(vectors, q, args.k), queries)
+
+    print(f"catalog={len(vectors)} dim={vectors.shape[1]} k={args.k} queries={len(queries)}")
+    print(f"{'mode':<16}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'MB':>10}")
+    print(f"{'float32':<16}{1.0:>10.3f}{np.median(exact_ms):>10.3f}"
+          f"{np.percentile(exact_ms, 95):>10.3f}{vectors.nbytes / 1024 ** 2:>10.1f}")
+
+    for dtype in QUANTIZATIONS:
+        quantized = QuantizedMatrix.quantize(vectors, dtype)
+        for rescore in args.rescore:
+            found, ms = timed(lambda q: quantized.search(q, args.k, vectors, rescore), queries)
+            recall = np.mean([len(np.intersect1d(f, t)) / args.k for f, t in zip(found, truth)])
+            label = f"{dtype}/{'raw' if rescore <= args.k else rescore}"
+            print(f"{label:<16}{recall:>10.3f}{np.median(ms):>10.3f}"
+                  f"{np.percentile(ms, 95):>10.3f}{quantized.nbytes / 1024 ** 2:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Build cost, memory and lookup latency of the autocomplete prefix index.
+
+    python -m benchmarks.suggest [--titles 1000000] [--lookups 2000]
+
+Generates ``--titles`` synthetic product titles from the metadata2.csv
+vocabulary with Zipf-distributed popularity, builds a PrefixIndex and times
+lookups for prefixes of 1 to 8 characters cut from random title words, the
+way a search box sends them while the user types.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.core.keyword_index import tokenize
+from app.core.suggest import PrefixIndex
+from benchmarks.keyword_search import percentiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autocomplete prefix index benchmark")
+    parser.add_argument("--metadata", default="metadata2.csv")
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = np.asarray(sorted({
+        token
+        for description in pd.read_csv(args.metadata)["description"].dropna()
+        for token in tokenize(description)
+        if len(token) > 2
+    }), dtype=object)
+    titles = [
+        " ".join(vocabulary[rng.integers(0, len(vocabulary), rng.integers(2, 7))]).title()
+        for _ in range(args.titles)
+    ]
+    popularity = rng.zipf(1.5, args.titles).clip(max=10_000)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = PrefixIndex(titles, popularity)
+    build_seconds = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"titles={len(index)} suffixes={len(index._suffix_entries)} build {build_seconds:.1f}s")
+    print(f"index ~{index.nbytes / 2**20:.0f} MB (retained {retained / 2**20:.0f} MB, "
+          f"build peak {peak / 2**20:.0f} MB)")
+
+    print(f"{'prefix len':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for length in range(1, 9):
+        prefixes = []
+        for _ in range(args.lookups):
+            word = vocabulary[rng.integers(0, len(vocabulary))]
+            prefixes.append(word[:length])
+
+        # First use of short prefixes fills the memo; time the steady state
+        for prefix in prefixes:
+            index.lookup(prefix, args.limit)
+
+        latencies = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.lookup(prefix, args.limit)
+            latencies.append(time.perf_counter() - started)
+        p50, p95 = percentiles(latencies)
+        print(f"{length:>10}{p50:>10.3f}{p95:>10.3f}{np.percentile(latencies, 99) * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()